@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+
+"""
+Compare per-call latency of a fresh connection per request (the old
+`requests.get(...)` behaviour) against the pooled `github_api.client`.
+
+Usage: benchmarks/bench_client.py [--calls N] [--connect-latency SECONDS]
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+
+import requests
+
+from github_api.client import GitHubClient
+from fake_github import FakeGitHub
+
+
+def _time_calls(fn, url, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        r = fn(url)
+        assert r.status_code == 200, r
+        r.json()
+    return (time.perf_counter() - start) / calls
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--connect-latency', type=float, default=0.005,
+                        help='Simulated handshake cost per new connection.')
+    opts = parser.parse_args(args)
+
+    repo = {'name': 'OpenROAD', 'full_name': 'The-OpenROAD-Project/OpenROAD'}
+    with FakeGitHub(connect_latency=opts.connect_latency) as gh:
+        gh.route('GET', r'/repos/([^/]+)/([^/]+)', lambda m, h, b: (200, repo, {}))
+        url = gh.url + '/repos/The-OpenROAD-Project/OpenROAD'
+
+        gh.connections = 0
+        unpooled = _time_calls(requests.get, url, opts.calls)
+        unpooled_conns = gh.connections
+
+        client = GitHubClient()
+        gh.connections = 0
+        pooled = _time_calls(lambda u: client.request('GET', u), url, opts.calls)
+        pooled_conns = gh.connections
+        client.close()
+
+    print(f"{'mode':<10} {'ms/call':>10} {'connections':>12}")
+    print(f"{'unpooled':<10} {unpooled*1000:>10.3f} {unpooled_conns:>12}")
+    print(f"{'pooled':<10} {pooled*1000:>10.3f} {pooled_conns:>12}")
+    print(f"saved {(unpooled-pooled)*1000:.3f} ms per call ({unpooled/pooled:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+"""
+Clone time of `clone_from`, comparing a fresh blobless clone on every run
+against the persistent mirror (cold, then warm with a few new commits each run).
+
+The upstream repository is a synthetic local bare repository.
+
+Usage: benchmarks/bench_clone.py [--commits N] [--files N] [--runs N]
+"""
+
+import argparse
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+
+from clone_from import action as clone_from
+
+
+def fast_import(repo, start, commits, files):
+    """Add `commits` commits to `main`, each changing a few of `files` files."""
+    lines = []
+    for i in range(start, start + commits):
+        lines.append('commit refs/heads/main')
+        lines.append(f'committer A <a@b> {1600000000 + i} +0000')
+        msg = f'Commit {i}'
+        lines.append(f'data {len(msg)}')
+        lines.append(msg)
+        if i == start and start > 0:
+            lines.append('from refs/heads/main^0')
+        for j in range(i % 7, files, 97):
+            data = f'{i} {j}\n' * 20
+            lines.append(f'M 644 inline dir{j % 32}/file{j}.txt')
+            lines.append(f'data {len(data)}')
+            lines.append(data)
+        lines.append('')
+    subprocess.run(['git', 'fast-import', '--quiet'], cwd=repo, check=True,
+                   input='\n'.join(lines) + '\n', text=True)
+
+
+def timed(fn, *args, **kw):
+    start = time.perf_counter()
+    fn(*args, **kw)
+    return time.perf_counter() - start
+
+
+def fresh_clone(url, dest):
+    subprocess.run(['rm', '-rf', dest], check=True)
+    subprocess.run(['git', 'clone', '--quiet', '--no-checkout', '--filter=blob:none', '--no-tags',
+                    '--origin', 'upstream', '--branch', 'main', url, dest], check=True)
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--commits', type=int, default=20000)
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--runs', type=int, default=3)
+    opts = parser.parse_args(args)
+
+    tmp = pathlib.Path(tempfile.mkdtemp())
+    upstream = tmp / 'upstream.git'
+    subprocess.run(['git', 'init', '--quiet', '--bare', str(upstream)], check=True)
+    subprocess.run(['git', 'config', 'uploadpack.allowFilter', 'true'], cwd=upstream, check=True)
+    fast_import(upstream, 0, opts.commits, opts.files)
+    url = upstream.as_uri()
+    cache = tmp / 'cache'
+    dest = tmp / 'repo'
+
+    def mirrored():
+        clone_from.clone_from('o/r', 'main', dest, url=url, cache=cache)
+
+    print(f"{'clone':<24} {'seconds':>8}")
+    total = opts.commits
+    for run in range(opts.runs):
+        fast_import(upstream, total, 5, opts.files)
+        total += 5
+        print(f"{'fresh blobless':<24} {timed(fresh_clone, url, dest):>8.2f}")
+        name = 'mirror (cold)' if run == 0 else 'mirror (warm)'
+        print(f"{name:<24} {timed(mirrored):>8.2f}")
+    subprocess.run(['rm', '-rf', str(tmp)], check=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+
+"""
+Decode time and memory of `Deployment` records, comparing the original
+`Deployment(**j)` (dict backed dataclass, timestamps left as strings) against
+`deployment.decode_deployments` over a synthetic deployment fixture.
+
+Usage: benchmarks/bench_deployment_decode.py [--count N]
+"""
+
+import argparse
+import dataclasses
+import gc
+import json
+import pathlib
+import sys
+import time
+import tracemalloc
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+
+from github_api import deployment as dapi
+
+
+def make_fixture(count, slug='The-OpenROAD-Project/OpenROAD-private'):
+    creator = {
+        'login': 'github-actions[bot]', 'id': 41898282, 'node_id': 'MDM6Qm90NDE4OTgyODI=',
+        'avatar_url': 'https://avatars.githubusercontent.com/in/15368?v=4', 'type': 'Bot',
+        'url': 'https://api.github.com/users/github-actions%5Bbot%5D', 'site_admin': False,
+    }
+    page = []
+    for i in range(count):
+        ts = f'2021-05-{1 + i % 28:02d}T{i % 24:02d}:48:37Z'
+        page.append({
+            'url': f'https://api.github.com/repos/{slug}/deployments/{365563468 + i}',
+            'id': 365563468 + i,
+            'node_id': f'MDEwOkRlcGxveW1lbnQ{i}',
+            'sha': f'{i:040x}',
+            'ref': f'{i:040x}',
+            'task': 'deploy',
+            'payload': {},
+            'original_environment': f'Upstream PR #{i % 500}',
+            'environment': f'Upstream PR #{i % 500}',
+            'description': '',
+            'creator': dict(creator),
+            'created_at': ts,
+            'updated_at': ts,
+            'statuses_url': f'https://api.github.com/repos/{slug}/deployments/{365563468 + i}/statuses',
+            'repository_url': f'https://api.github.com/repos/{slug}',
+            'transient_environment': True,
+            'production_environment': False,
+            'performed_via_github_app': None,
+        })
+    # Round trip through JSON so the fixture looks like a decoded response.
+    return json.loads(json.dumps(page))
+
+
+# The original, dict backed, record type.
+LegacyDeployment = dataclasses.make_dataclass(
+    'LegacyDeployment',
+    [(f.name, f.type) if f.default is dataclasses.MISSING else
+     (f.name, f.type, dataclasses.field(default=f.default))
+     for f in dataclasses.fields(dapi.Deployment)],
+)
+
+
+def measure(fn, page):
+    gc.collect()
+    start = time.perf_counter()
+    records = fn(page)
+    elapsed = time.perf_counter() - start
+    del records
+
+    gc.collect()
+    tracemalloc.start()
+    records = fn(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=10000)
+    opts = parser.parse_args(args)
+
+    page = make_fixture(opts.count)
+    results = [
+        ('Deployment(**j)', measure(lambda p: [LegacyDeployment(**j) for j in p], page)),
+        ('decode_deployments', measure(dapi.decode_deployments, page)),
+    ]
+    print(f"{'decoder':<20} {'ms':>10} {'peak KiB':>10}")
+    for name, (elapsed, peak) in results:
+        print(f"{name:<20} {elapsed*1000:>10.2f} {peak/1024:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+"""
+Encode time of request payloads, comparing `dataclasses.asdict` followed by
+`cleanup_json_dict` against the generated `github_api.encoder` functions.
+
+Usage: benchmarks/bench_encode.py [--count N]
+"""
+
+import argparse
+import dataclasses
+import pathlib
+import sys
+import time
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+
+import github_api
+from github_api import deployment as dapi
+from github_api import encoder
+
+
+def make_payloads(count):
+    payloads = []
+    for i in range(count):
+        payloads.append(dapi.DeploymentCreate(
+            ref=f'{i:040x}',
+            auto_merge=False,
+            payload={'pr': i, 'branch': f'branch-{i}', 'skip': None},
+            environment=f'Upstream PR #{i}',
+            description=f'Pull request #{i} of staging.',
+            transient_environment=True,
+        ))
+        payloads.append(dapi.DeploymentStatusCreate(
+            state=dapi.DeploymentState.success,
+            environment=f'Upstream PR #{i}',
+            environment_url=f'https://github.com/o/r/pull/{i}',
+        ))
+    return payloads
+
+
+def asdict_cleanup(p):
+    d = dataclasses.asdict(p)
+    github_api.cleanup_json_dict(d)
+    return d
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=20000)
+    opts = parser.parse_args(args)
+
+    payloads = make_payloads(opts.count)
+    for p in payloads[:2]:
+        assert encoder.encode(p) == asdict_cleanup(p), (encoder.encode(p), asdict_cleanup(p))
+
+    print(f"{'encoder':<24} {'us/payload':>10}")
+    for name, fn in (('asdict + cleanup', asdict_cleanup), ('encoder.encode', encoder.encode)):
+        start = time.perf_counter()
+        for p in payloads:
+            fn(p)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<24} {elapsed * 1e6 / len(payloads):>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+"""
+Decode time and peak memory of large list pages, comparing `json.loads` of the
+whole page against `github_api.projection` decoding only the fields used.
+
+Usage: benchmarks/bench_projection.py [--pages N]
+"""
+
+import argparse
+import gc
+import json
+import pathlib
+import sys
+import time
+import tracemalloc
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+
+from github_api import projection
+from github_api import deployment as dapi
+from bench_deployment_decode import make_fixture as make_deployments
+
+
+def _user(login, i):
+    return {
+        'login': login, 'id': 1000 + i, 'node_id': f'MDQ6VXNlcjEwMD{i}',
+        'avatar_url': f'https://avatars.githubusercontent.com/u/{1000 + i}?v=4', 'gravatar_id': '',
+        'url': f'https://api.github.com/users/{login}',
+        'html_url': f'https://github.com/{login}',
+        **{k: f'https://api.github.com/users/{login}/{k[:-4]}' for k in (
+            'followers_url', 'following_url', 'gists_url', 'starred_url', 'subscriptions_url',
+            'organizations_url', 'repos_url', 'events_url', 'received_events_url')},
+        'type': 'User', 'site_admin': False,
+    }
+
+
+def _repo(slug, i):
+    owner, name = slug.split('/')
+    api = f'https://api.github.com/repos/{slug}'
+    r = {
+        'id': 2000 + i, 'node_id': f'MDEwOlJlcG9zaXRvcnky{i}', 'name': name, 'full_name': slug,
+        'private': False, 'owner': _user(owner, i), 'html_url': f'https://github.com/{slug}',
+        'description': 'The OpenROAD project ' * 4, 'fork': True, 'url': api,
+        'created_at': '2019-06-20T18:38:00Z', 'updated_at': '2021-05-20T18:38:00Z',
+        'pushed_at': '2021-05-20T18:38:00Z', 'homepage': 'https://theopenroadproject.org',
+        'size': 123456, 'stargazers_count': 321, 'watchers_count': 321, 'language': 'C++',
+        'has_issues': True, 'has_projects': True, 'has_downloads': True, 'has_wiki': True,
+        'forks_count': 123, 'open_issues_count': 45, 'default_branch': 'master',
+    }
+    for k in ('forks', 'keys', 'collaborators', 'teams', 'hooks', 'issue_events', 'events',
+              'assignees', 'branches', 'tags', 'blobs', 'git_tags', 'git_refs', 'trees',
+              'statuses', 'languages', 'stargazers', 'contributors', 'subscribers',
+              'subscription', 'commits', 'git_commits', 'comments', 'issue_comment',
+              'contents', 'compare', 'merges', 'archive', 'downloads', 'issues', 'pulls',
+              'milestones', 'notifications', 'labels', 'releases', 'deployments'):
+        r[f'{k}_url'] = f'{api}/{k}{{/id}}'
+    return r
+
+
+def make_pulls(count, slug='The-OpenROAD-Project/OpenROAD-private'):
+    """A page of `/pulls` results, as large as the real thing."""
+    page = []
+    for i in range(count):
+        api = f'https://api.github.com/repos/{slug}/pulls/{i}'
+        page.append({
+            'url': api, 'id': 3000 + i, 'node_id': f'MDExOlB1bGxSZXF1ZXN0{i}', 'number': i,
+            'state': 'open', 'locked': False, 'title': f'Pull request {i}',
+            'user': _user(f'user{i % 10}', i), 'body': 'Some description.\n' * 20,
+            'created_at': '2021-05-20T18:38:00Z', 'updated_at': '2021-05-20T18:38:00Z',
+            'labels': [{'id': 1, 'name': 'ready-to-sync', 'color': 'ededed', 'default': False}],
+            'head': {'label': f'user:branch-{i}', 'ref': f'branch-{i}', 'sha': f'{i:040x}',
+                     'user': _user(f'user{i % 10}', i), 'repo': _repo(slug, i)},
+            'base': {'label': 'org:master', 'ref': 'master', 'sha': f'{i + 1:040x}',
+                     'user': _user('org', i), 'repo': _repo(slug, i)},
+            '_links': {k: {'href': f'{api}/{k}'} for k in (
+                'self', 'html', 'issue', 'comments', 'review_comments', 'review_comment',
+                'commits', 'statuses')},
+            'author_association': 'MEMBER', 'draft': False,
+        })
+    return page
+
+
+PULL_FIELDS = ('number', 'head.ref', 'head.sha', 'title', 'body', 'user.login')
+
+
+def _pick(j, spec):
+    return {k: j[k] if s is None else _pick(j[k], s) for k, s in spec.items() if k in j}
+
+
+def measure(fn, pages):
+    gc.collect()
+    start = time.perf_counter()
+    for text in pages:
+        for _ in fn(text):
+            pass
+    elapsed = time.perf_counter() - start
+
+    # Peak while holding one decoded page, as `iter_github_json` does.
+    gc.collect()
+    tracemalloc.start()
+    kept = list(fn(pages[0]))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return elapsed, peak
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--per-page', type=int, default=100)
+    opts = parser.parse_args(args)
+
+    fixtures = [
+        ('pulls', make_pulls(opts.per_page), PULL_FIELDS),
+        ('deployments', make_deployments(opts.per_page), dapi.INDEX_FIELDS),
+    ]
+    print(f"{'page':<12} {'decoder':<12} {'KiB/page':>9} {'ms/page':>9} {'peak KiB':>9}")
+    for name, page, fields in fixtures:
+        pages = [json.dumps(page)] * opts.pages
+        spec = projection.compile_fields(fields)
+        results = [
+            ('json.loads', measure(lambda t: [_pick(j, spec) for j in json.loads(t)], pages)),
+            ('projection', measure(lambda t: projection.iter_array(t, spec), pages)),
+        ]
+        for decoder, (elapsed, peak) in results:
+            print(f"{name:<12} {decoder:<12} {len(pages[0])/1024:>9.1f}"
+                  f" {elapsed*1000/opts.pages:>9.2f} {peak/1024:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+
+import gzip
+import http.server
+import json
+import re
+import threading
+import time
+import urllib.parse
+
+
+"""
+Local stand-in for the GitHub REST API used by the benchmarks.
+
+The server speaks HTTP/1.1 with keep-alive, so clients which pool connections
+see the benefit. `connect_latency` is paid once per new connection (to model
+the TCP+TLS handshake against api.github.com) and `latency` once per request.
+"""
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        self.server.fake.connections += 1
+        if self.server.fake.connect_latency:
+            time.sleep(self.server.fake.connect_latency)
+        super().setup()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self):
+        fake = self.server.fake
+        length = int(self.headers.get('Content-Length', 0) or 0)
+        body = self.rfile.read(length) if length else b''
+        body = json.loads(body) if body else None
+
+        if fake.latency:
+            time.sleep(fake.latency)
+
+        status, data, headers = fake.dispatch(self.command, self.path, self.headers, body)
+
+        payload = json.dumps(data).encode('utf-8') if data is not None else b''
+        if payload and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            payload = gzip.compress(payload)
+            headers['Content-Encoding'] = 'gzip'
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = _handle
+    do_POST = _handle
+    do_PATCH = _handle
+    do_PUT = _handle
+    do_DELETE = _handle
+
+
+class Request:
+    """What a route handler gets to see of the request."""
+
+    def __init__(self, method, path, headers):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.query = {k: v[-1] for k, v in urllib.parse.parse_qs(urllib.parse.urlsplit(path).query).items()}
+
+    def get(self, name, default=None):
+        return self.headers.get(name, default)
+
+
+class FakeGitHub:
+    """A tiny, routable fake GitHub API server.
+
+    >>> with FakeGitHub() as gh:
+    ...     gh.route('GET', r'/zen', lambda m, h, b: (200, 'Hello', {}))
+    ...     import urllib.request
+    ...     urllib.request.urlopen(gh.url + '/zen').read()
+    b'"Hello"'
+    """
+
+    def __init__(self, latency=0.0, connect_latency=0.0, rate_limit=None):
+        self.latency = latency
+        self.connect_latency = connect_latency
+        # Requests allowed per window when emitting X-RateLimit-* headers.
+        self.rate_limit = rate_limit
+        self.rate_used = 0
+        self.rate_reset = int(time.time()) + 3600
+        # Queue of (status, json, headers) replies returned before routing,
+        # used to inject secondary rate limit failures.
+        self.failures = []
+        self.routes = []
+        self.calls = []
+        self.connections = 0
+        self._httpd = None
+        self._thread = None
+
+    def route(self, method, pattern, handler):
+        """`handler(match, request, body)` returns `(status, json, headers)`."""
+        self.routes.insert(0, (method, re.compile(pattern + '$'), handler))
+
+    def fail_next(self, status=403, headers=(), message='You have exceeded a secondary rate limit.'):
+        self.failures.append((status, {'message': message}, dict(headers)))
+
+    def _rate_headers(self):
+        if self.rate_limit is None:
+            return {}
+        return {
+            'X-RateLimit-Limit': str(self.rate_limit),
+            'X-RateLimit-Remaining': str(max(0, self.rate_limit - self.rate_used)),
+            'X-RateLimit-Reset': str(self.rate_reset),
+            'X-RateLimit-Used': str(self.rate_used),
+            'X-RateLimit-Resource': 'core',
+        }
+
+    def dispatch(self, method, path, headers, body):
+        self.calls.append((method, path))
+        if self.failures:
+            status, data, extra = self.failures.pop(0)
+            return status, data, {**self._rate_headers(), **extra}
+        if self.rate_limit is not None:
+            if self.rate_used >= self.rate_limit:
+                return 403, {'message': 'API rate limit exceeded'}, self._rate_headers()
+            self.rate_used += 1
+
+        route_path = path.split('?', 1)[0]
+        for m, regex, handler in self.routes:
+            if m != method:
+                continue
+            match = regex.match(route_path)
+            if match:
+                status, data, extra = handler(match, Request(method, path, headers), body)
+                return status, data, {**self._rate_headers(), **extra}
+        return 404, {'message': 'Not Found'}, self._rate_headers()
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+
+def _repo_json(gh, slug, parent=None):
+    owner, name = slug.split('/')
+    j = {
+        'id': abs(hash(slug)) % 10**8,
+        'name': name,
+        'full_name': slug,
+        'owner': {'login': owner, 'id': 1, 'type': 'Organization', 'url': f'{gh.url}/users/{owner}'},
+        'private': parent is not None,
+        'fork': parent is not None,
+        'default_branch': 'master',
+        'url': f'{gh.url}/repos/{slug}',
+    }
+    if parent is not None:
+        j['parent'] = parent
+        j['source'] = parent
+    return j
+
+
+class GitHubState:
+    """The repositories, pull requests and deployments served by `add_api_routes`."""
+
+    def __init__(self, private='Org/OpenROAD-private', staging='Staging/OpenROAD',
+                 upstream='Upstream/OpenROAD', deployments=0):
+        self.private = private
+        self.staging = staging
+        self.upstream = upstream
+        self.branches = {}
+        self.pulls = {}
+        self.deployments = []
+        self.statuses = {}
+        self.labels = {}
+        self._deployments = deployments
+        self._next_id = 1000
+
+    def next_id(self):
+        self._next_id += 1
+        return self._next_id
+
+    def add_pull(self, slug, head_owner, branch, sha, title='', user='octocat'):
+        number = len(self.pulls.get(slug, [])) + 1
+        pr = {
+            'number': number,
+            'state': 'open',
+            'title': title,
+            'body': '',
+            'user': {'login': user},
+            'head': {'ref': branch, 'sha': sha, 'label': f'{head_owner}:{branch}',
+                     'repo': {'full_name': f'{head_owner}/{slug.split("/")[1]}'}},
+            'base': {'ref': 'master', 'repo': {'full_name': slug}},
+        }
+        self.pulls.setdefault(slug, []).append(pr)
+        return pr
+
+    def add_deployment(self, gh, environment, sha):
+        i = self.next_id()
+        ts = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(1600000000 + i))
+        d = {
+            'url': f'{gh.url}/repos/{self.private}/deployments/{i}',
+            'id': i,
+            'node_id': f'DE_{i}',
+            'sha': sha,
+            'ref': sha,
+            'task': 'deploy',
+            'payload': {},
+            'original_environment': environment,
+            'environment': environment,
+            'description': '',
+            'creator': {'login': 'github-actions[bot]', 'id': 41898282, 'type': 'Bot'},
+            'created_at': ts,
+            'updated_at': ts,
+            'statuses_url': f'{gh.url}/repos/{self.private}/deployments/{i}/statuses',
+            'repository_url': f'{gh.url}/repos/{self.private}',
+            'transient_environment': True,
+            'production_environment': False,
+        }
+        self.deployments.insert(0, d)
+        return d
+
+
+def paginate(gh, request, items):
+    """Return one page of `items` and the `Link` header for it."""
+    per_page = int(request.query.get('per_page', 30))
+    page = int(request.query.get('page', 1))
+    start = (page - 1) * per_page
+    headers = {}
+    if start + per_page < len(items):
+        query = dict(request.query, page=page + 1, per_page=per_page)
+        path = urllib.parse.urlsplit(request.path).path
+        headers['Link'] = f'<{gh.url}{path}?{urllib.parse.urlencode(query)}>; rel="next"'
+    return items[start:start+per_page], headers
+
+
+def _braced(q, start):
+    """The text between the `{` at `start` and its matching `}`."""
+    depth = 0
+    for i in range(start, len(q)):
+        if q[i] == '{':
+            depth += 1
+        elif q[i] == '}':
+            depth -= 1
+            if depth == 0:
+                return q[start+1:i]
+    raise ValueError(q[start:])
+
+
+def _graphql_deployment(state, d):
+    statuses = state.statuses.get(d['id'], [])
+    latest = None
+    if statuses:
+        s = statuses[0]
+        latest = {
+            'id': s.get('node_id', f"DES_{s['id']}"), 'state': s['state'].upper(),
+            'description': s.get('description', None),
+            'environmentUrl': s.get('environment_url', None), 'logUrl': s.get('log_url', None),
+            'createdAt': d['created_at'], 'updatedAt': d['updated_at'],
+            'creator': s.get('creator', None),
+        }
+    return {
+        'databaseId': d['id'], 'id': d['node_id'], 'commitOid': d['sha'], 'ref': None,
+        'task': d['task'], 'environment': d['environment'],
+        'originalEnvironment': d['original_environment'], 'description': d['description'],
+        'createdAt': d['created_at'], 'updatedAt': d['updated_at'], 'latestStatus': latest,
+    }
+
+
+def graphql_query(state, q):
+    """Answer the queries sent by `github_api.graphql`.
+
+    Only aliased `repository` fields holding `deployments(environments: ...)`
+    and `object(oid: ...)` (associated pull requests) fields are supported.
+    """
+    data = {}
+    for m in re.finditer(r'(\w+): repository\(owner: "([^"]*)", name: "([^"]*)"\) \{', q):
+        body = _braced(q, m.end() - 1)
+        repo = {}
+        for d in re.finditer(r'(\w+): deployments\(environments: \[([^\]]*)\], first: (\d+)', body):
+            environments = json.loads('[' + d.group(2) + ']')
+            ds = [x for x in state.deployments if x['environment'] in environments]
+            repo[d.group(1)] = {'nodes': [_graphql_deployment(state, x) for x in ds[:int(d.group(3))]]}
+        for c in re.finditer(r'(\w+): object\(oid: "([0-9a-f]+)"\)', body):
+            prs = [pr for prs in state.pulls.values() for pr in prs
+                   if pr['head']['sha'] == c.group(2) and pr['state'] == 'open']
+            repo[c.group(1)] = {'associatedPullRequests': {'nodes': [
+                {'number': pr['number'], 'state': pr['state'].upper(), 'headRefName': pr['head']['ref'],
+                 'headRefOid': pr['head']['sha'], 'baseRefName': pr['base']['ref'],
+                 'baseRepository': {'nameWithOwner': pr['base']['repo']['full_name']}}
+                for pr in prs]}}
+        data[m.group(1)] = repo
+    return {'data': data}
+
+
+def add_api_routes(gh, state):
+    """Serve the endpoints used by the actions from `state`."""
+    repo = r'/repos/(?P<owner>[^/]+)/(?P<repo>[^/]+)'
+
+    def slug(m):
+        return f"{m.group('owner')}/{m.group('repo')}"
+
+    for i in range(state._deployments):
+        state.add_deployment(gh, f'Upstream PR #{10000 + i}', f'{i:040x}')
+
+    def get_repo(m, req, body):
+        s = slug(m)
+        parent = _repo_json(gh, state.upstream) if s == state.private else None
+        return 200, _repo_json(gh, s, parent), {}
+    gh.route('GET', repo, get_repo)
+
+    def commit_pulls(m, req, body):
+        sha = m.group('sha')
+        prs = [pr for prs in state.pulls.values() for pr in prs
+               if pr['head']['sha'] == sha and pr['state'] == 'open']
+        return 200, prs, {}
+    gh.route('GET', repo + r'/commits/(?P<sha>[^/]+)/pulls', commit_pulls)
+
+    def list_pulls(m, req, body):
+        prs = [pr for pr in state.pulls.get(slug(m), []) if pr['state'] == req.query.get('state', 'open')]
+        if 'head' in req.query:
+            prs = [pr for pr in prs if pr['head']['label'] == req.query['head']]
+        page, headers = paginate(gh, req, prs)
+        return 200, page, headers
+    gh.route('GET', repo + r'/pulls', list_pulls)
+
+    def get_pull(m, req, body):
+        for pr in state.pulls.get(slug(m), []):
+            if pr['number'] == int(m.group('n')):
+                return 200, pr, {}
+        return 404, {'message': 'Not Found'}, {}
+    gh.route('GET', repo + r'/pulls/(?P<n>\d+)', get_pull)
+
+    def create_pull(m, req, body):
+        head_owner, branch = body['head'].split(':', 1)
+        sha = state.branches.get(branch, None)
+        if sha is None:
+            return 422, {'message': 'Validation Failed'}, {}
+        return 201, state.add_pull(slug(m), head_owner, branch, sha, body['title']), {}
+    gh.route('POST', repo + r'/pulls', create_pull)
+
+    gh.route('POST', repo + r'/issues/(?P<n>\d+)/assignees',
+             lambda m, req, body: (201, {'number': int(m.group('n')), 'assignees': body['assignees']}, {}))
+
+    def list_labels(m, req, body):
+        return 200, [{'name': n} for n in state.labels.get((slug(m), int(m.group('n'))), [])], {}
+    gh.route('GET', repo + r'/issues/(?P<n>\d+)/labels', list_labels)
+
+    def set_labels(m, req, body):
+        state.labels[(slug(m), int(m.group('n')))] = list(body['labels'])
+        return list_labels(m, req, body)
+    gh.route('PUT', repo + r'/issues/(?P<n>\d+)/labels', set_labels)
+
+    def add_labels(m, req, body):
+        labels = state.labels.setdefault((slug(m), int(m.group('n'))), [])
+        labels += [l for l in body['labels'] if l not in labels]
+        return list_labels(m, req, body)
+    gh.route('POST', repo + r'/issues/(?P<n>\d+)/labels', add_labels)
+
+    def delete_label(m, req, body):
+        labels = state.labels.get((slug(m), int(m.group('n'))), [])
+        name = urllib.parse.unquote(m.group('name'))
+        if name not in labels:
+            return 404, {'message': 'Label does not exist'}, {}
+        labels.remove(name)
+        return list_labels(m, req, body)
+    gh.route('DELETE', repo + r'/issues/(?P<n>\d+)/labels/(?P<name>[^/]+)', delete_label)
+
+    def search_issues(m, req, body):
+        # Only the `repo:` and `label:` qualifiers are supported.
+        terms = re.findall(r'(\w+):("[^"]*"|\S+)', req.query.get('q', ''))
+        repos = [v for k, v in terms if k == 'repo']
+        wanted = [v.strip('"') for k, v in terms if k == 'label']
+        items = [
+            {'number': n, 'repository_url': f'{gh.url}/repos/{s}', 'title': f'Pull request {n}',
+             'labels': [{'name': l} for l in labels], 'body': 'x' * 1024}
+            for (s, n), labels in sorted(state.labels.items())
+            if (not repos or s in repos) and all(l in labels for l in wanted)
+        ]
+        page, headers = paginate(gh, req, items)
+        return 200, {'total_count': len(items), 'incomplete_results': False, 'items': page}, headers
+    gh.route('GET', r'/search/issues', search_issues)
+
+    def list_deployments(m, req, body):
+        ds = state.deployments
+        if 'environment' in req.query:
+            ds = [d for d in ds if d['environment'] == req.query['environment']]
+        if 'sha' in req.query:
+            ds = [d for d in ds if d['sha'] == req.query['sha']]
+        page, headers = paginate(gh, req, ds)
+        return 200, page, headers
+    gh.route('GET', repo + r'/deployments', list_deployments)
+
+    gh.route('POST', repo + r'/deployments',
+             lambda m, req, body: (201, state.add_deployment(gh, body['environment'], body['ref']), {}))
+
+    def get_deployment(m, req, body):
+        for d in state.deployments:
+            if d['id'] == int(m.group('id')):
+                return 200, d, {}
+        return 404, {'message': 'Not Found'}, {}
+    gh.route('GET', repo + r'/deployments/(?P<id>\d+)', get_deployment)
+
+    gh.route('GET', repo + r'/deployments/(?P<id>\d+)/statuses',
+             lambda m, req, body: (200, state.statuses.get(int(m.group('id')), []), {}))
+
+    def create_status(m, req, body):
+        status = dict(body, id=state.next_id(), node_id='DES', creator={'login': 'bot'})
+        state.statuses.setdefault(int(m.group('id')), []).insert(0, status)
+        return 201, status, {}
+    gh.route('POST', repo + r'/deployments/(?P<id>\d+)/statuses', create_status)
+
+    gh.route('POST', r'/graphql', lambda m, req, body: (200, graphql_query(state, body['query']), {}))
+
+    gh.route('GET', repo + r'/installation',
+             lambda m, req, body: (200, {'id': 1, 'access_tokens_url': f'{gh.url}/app/installations/1/access_tokens'}, {}))
+    gh.route('POST', r'/app/installations/(?P<id>\d+)/access_tokens',
+             lambda m, req, body: (201, {'token': 'ghs_fake', 'expires_at': '2099-01-01T00:00:00Z'}, {}))
+    return state
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
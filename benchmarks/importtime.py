@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+"""
+Import time budget for `github_api`, checked with `python3 -X importtime`.
+
+Each action step starts a fresh interpreter, so import cost is paid on every
+step. Importing the modules below must stay within `BUDGET_MS` and must not
+pull in the modules listed in `DEFERRED` (which are only imported once they
+are actually used).
+
+Usage: benchmarks/importtime.py [--runs N]
+"""
+
+import argparse
+import os
+import pathlib
+import subprocess
+import sys
+
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+# Generous, so only a real regression (like importing `requests`) trips them.
+BUDGET_MS = {
+    'github_api': 25,
+    'github_api.env': 40,
+}
+
+DEFERRED = {
+    'github_api': ('requests', 'urllib3', 'jwt', 'pprint', 'dataclasses'),
+    'github_api.env': ('requests', 'urllib3', 'jwt', 'pprint'),
+}
+
+
+def parse_importtime(stderr):
+    """Returns {module: cumulative microseconds} from `-X importtime` output.
+
+    >>> parse_importtime('''import time: self [us] | cumulative | imported package
+    ... import time:       120 |        120 |   json.decoder
+    ... import time:       300 |        420 | json
+    ... ''')
+    {'json.decoder': 120, 'json': 420}
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, self_us, cumulative, name = (p.strip() for p in line.replace(':', '|', 1).split('|'))
+        if not cumulative.isdigit():
+            continue
+        times[name] = int(cumulative)
+    return times
+
+
+def measure(module):
+    env = {k: v for k, v in os.environ.items() if not k.startswith('PYTHON')}
+    p = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return parse_importtime(p.stderr)
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Best of N runs.')
+    opts = parser.parse_args(args)
+
+    failures = 0
+    print(f"{'module':<20} {'ms':>8} {'budget':>8}")
+    for module, budget in BUDGET_MS.items():
+        runs = [measure(module) for _ in range(opts.runs)]
+        ms = min(r[module] for r in runs) / 1000
+        problems = []
+        if ms > budget:
+            problems.append('over budget')
+        loaded = [m for m in DEFERRED[module] if m in runs[0]]
+        if loaded:
+            problems.append('imports ' + ', '.join(loaded))
+        failures += bool(problems)
+        flag = ('  FAIL: ' + '; '.join(problems)) if problems else ''
+        print(f"{module:<20} {ms:>8.1f} {budget:>8}{flag}", flush=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+
+"""
+End-to-end benchmarks of the action scripts against a local fake GitHub API.
+
+Each scenario runs one action (as its own `python3` process, the same as in a
+workflow) against `fake_github.FakeGitHub` with a synthetic event payload and
+reports the number of API calls, wall time and peak RSS. Results are compared
+against `baselines.json` and regressions are flagged.
+
+Usage: benchmarks/run.py [--latency SECONDS] [--deployments N] [--update-baselines]
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+
+
+from fake_github import FakeGitHub, GitHubState, add_api_routes
+
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+BASELINES = pathlib.Path(__file__).resolve().parent / 'baselines.json'
+
+# Allowed slow down before a result counts as a regression. API call counts
+# must not go up at all.
+TOLERANCE = {'wall_ms': 0.5, 'rss_kib': 0.2}
+
+PR_NUMBER = 42
+PR_BRANCH = 'feature-branch'
+PR_SHA = 'a' * 40
+
+
+def event_payload(state, body_size, label=None):
+    owner, name = state.private.split('/')
+    e = {
+        'action': 'labeled' if label else 'synchronize',
+        'number': PR_NUMBER,
+        'pull_request': {
+            'number': PR_NUMBER,
+            'title': 'Synthetic pull request',
+            'body': 'x' * body_size,
+            'user': {'login': 'octocat'},
+            'head': {
+                'ref': PR_BRANCH,
+                'sha': PR_SHA,
+                'repo': {'name': name, 'full_name': state.private, 'owner': {'login': owner}},
+            },
+            'base': {'ref': 'master', 'repo': {'full_name': state.private}},
+        },
+        'repository': {'name': name, 'full_name': state.private, 'owner': {'login': owner}},
+    }
+    if label:
+        e['label'] = {'name': label}
+    return e
+
+
+def setup_send_pr_new(gh, state):
+    state.branches[PR_BRANCH] = PR_SHA
+
+
+def setup_send_pr_existing(gh, state):
+    state.branches[PR_BRANCH] = PR_SHA
+    state.add_pull(state.upstream, state.staging.split('/')[0], PR_BRANCH, PR_SHA)
+
+
+def setup_link_pr_existing(gh, state):
+    d = state.add_deployment(gh, f'Upstream PR #{PR_NUMBER}', PR_SHA)
+    state.statuses[d['id']] = [{'id': 1, 'state': 'success'}]
+
+
+def setup_remove_label(gh, state):
+    state.labels[(state.private, PR_NUMBER)] = ['ready-to-sync', 'other']
+
+
+def setup_remove_labels_bulk(gh, state):
+    for n in range(1, 21):
+        state.labels[(state.private, n)] = ['ready-to-sync', 'other', 'keep']
+
+
+def setup_link_pr_all(gh, state):
+    private_owner = state.private.split('/')[0]
+    staging_owner = state.staging.split('/')[0]
+    for n in range(1, 21):
+        branch, sha = f'branch-{n}', f'{n:040x}'
+        state.add_pull(state.private, private_owner, branch, sha)
+        state.add_pull(state.upstream, staging_owner, branch, sha)
+
+
+# Scenarios normally run with `GITHUB_API_MUTATION_INTERVAL=0` to measure our
+# own overhead; these keep the default spacing between mutating calls so the
+# baselines also cover the pacing a real run pays.
+PACED = {'GITHUB_API_MUTATION_INTERVAL': None}
+
+SCENARIOS = {
+    'env': (['-m', 'github_api.env'], None, {}),
+    'send_pr_new': (['send_pr/action.py'], setup_send_pr_new, {}),
+    'send_pr_existing': (['send_pr/action.py'], setup_send_pr_existing, {}),
+    'link_pr_new': (['link_pr/action.py'], None, {'UPSTREAM_PR': str(PR_NUMBER)}),
+    'send_pr_new_paced': (['send_pr/action.py'], setup_send_pr_new, PACED),
+    'link_pr_new_paced': (['link_pr/action.py'], None, {'UPSTREAM_PR': str(PR_NUMBER), **PACED}),
+    'link_pr_existing': (['link_pr/action.py'], setup_link_pr_existing, {'UPSTREAM_PR': str(PR_NUMBER)}),
+    'link_pr_all': (['link_pr/action.py', '--all'], setup_link_pr_all, {}),
+    'remove_label': (['remove_label/action.py'], setup_remove_label, {}),
+    'remove_labels_bulk': (['remove_label/action.py', '--search', 'label:ready-to-sync',
+                            '--remove', 'ready-to-sync', '--remove', 'other'],
+                           setup_remove_labels_bulk, {}),
+    # `env` then `link_pr` in one interpreter (see `github_api.__main__`).
+    'env_link_pr': (['-m', 'github_api', 'env', '--', 'link_pr'], None, {'UPSTREAM_PR': str(PR_NUMBER)}),
+}
+
+
+def run_scenario(name, opts):
+    args, setup, extra_env = SCENARIOS[name]
+    with FakeGitHub(latency=opts.latency, rate_limit=5000) as gh, \
+            tempfile.TemporaryDirectory() as tmp:
+        state = add_api_routes(gh, GitHubState(deployments=opts.deployments))
+        if setup is not None:
+            setup(gh, state)
+
+        event_path = pathlib.Path(tmp) / 'event.json'
+        label = 'ready-to-sync' if name.startswith('remove_label') else None
+        event_path.write_text(json.dumps(event_payload(state, opts.body_size, label)))
+
+        env = {k: v for k, v in os.environ.items() if not k.startswith('GITHUB_')}
+        env.update({
+            'GITHUB_API_URL': gh.url,
+            'GITHUB_EVENT_PATH': str(event_path),
+            'GITHUB_TOKEN': 'ghs_fake',
+            'STAGING_GITHUB_TOKEN': 'ghs_fake',
+            'STAGING_OWNER': state.staging.split('/')[0],
+            'UPSTREAM_OWNER': state.upstream.split('/')[0],
+            # Measure our own overhead, not GitHub's recommended pacing.
+            'GITHUB_API_MUTATION_INTERVAL': '0',
+        })
+        env.update(extra_env)
+        env = {k: v for k, v in env.items() if v is not None}
+
+        gh.calls.clear()
+        start = time.perf_counter()
+        p = subprocess.Popen(
+            [sys.executable] + args, cwd=ROOT, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        _, status, rusage = os.wait4(p.pid, 0)
+        wall = time.perf_counter() - start
+        stderr = p.stderr.read().decode('utf-8', 'replace')
+        p.stderr.close()
+        if os.waitstatus_to_exitcode(status) != 0:
+            raise SystemError(f'{name} failed:\n{stderr}')
+
+        return {
+            'calls': len(gh.calls),
+            'wall_ms': round(wall * 1000, 1),
+            # ru_maxrss is in KiB on Linux (bytes on macOS).
+            'rss_kib': rusage.ru_maxrss // (1024 if sys.platform == 'darwin' else 1),
+        }
+
+
+def compare(name, result, baseline):
+    problems = []
+    if baseline is None:
+        return problems
+    if result['calls'] > baseline['calls']:
+        problems.append(f"calls {baseline['calls']} -> {result['calls']}")
+    for k, tol in TOLERANCE.items():
+        if result[k] > baseline[k] * (1 + tol):
+            problems.append(f"{k} {baseline[k]} -> {result[k]}")
+    return problems
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scenarios', nargs='*', default=list(SCENARIOS), help='Scenarios to run.')
+    parser.add_argument('--latency', type=float, default=0.02, help='Simulated latency per API call.')
+    parser.add_argument('--deployments', type=int, default=500,
+                        help='Existing deployments in the private repository.')
+    parser.add_argument('--body-size', type=int, default=64 * 1024,
+                        help='Size of the pull request body in the event payload.')
+    parser.add_argument('--update-baselines', action='store_true')
+    opts = parser.parse_args(args)
+
+    baselines = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+
+    regressions = 0
+    results = {}
+    print(f"{'scenario':<20} {'calls':>6} {'wall ms':>10} {'rss KiB':>10}")
+    for name in opts.scenarios:
+        r = results[name] = run_scenario(name, opts)
+        problems = compare(name, r, baselines.get(name, None))
+        regressions += bool(problems)
+        flag = ('  REGRESSION: ' + ', '.join(problems)) if problems else ''
+        print(f"{name:<20} {r['calls']:>6} {r['wall_ms']:>10.1f} {r['rss_kib']:>10}{flag}", flush=True)
+
+    if opts.update_baselines:
+        baselines.update(results)
+        BASELINES.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+        print(f"Updated {BASELINES}")
+        return 0
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
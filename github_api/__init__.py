@@ -18,14 +18,19 @@
 # SPDX-License-Identifier: Apache-2.0
 
 
-import dataclasses
 import enum
 import json
 import os
-import requests
+import time
 
 
-from datetime import datetime
+from datetime import datetime, timezone
+
+from . import cache
+from . import client
+from .client import API_URL
+from . import projection
+from . import telemetry
 
 
 def fromisoformat(s):
@@ -65,22 +70,22 @@ def toisoformat(s):
 TOKEN_ENV_NAME = 'GITHUB_TOKEN'
 
 
-def github_headers(preview=None, _headers={}):
-    if not _headers:
-        # Figure out the GitHub access token.
-        access_token = os.environ.get(TOKEN_ENV_NAME, None)
+def github_headers(preview=None):
+    # Figure out the GitHub access token. Not memoized, as an app's
+    # installation token expires (`app_token` caches it until shortly before).
+    access_token = os.environ.get(TOKEN_ENV_NAME, None)
+    if not access_token:
+        from . import app_token
+        access_token = app_token.get_token()
         if not access_token:
-            from . import app_token
-            access_token = app_token.get_token()
-            if not access_token:
-                raise SystemError(
-                    f'Did not find an access token of `{TOKEN_ENV_NAME}`')
-        _headers['Authorization'] = 'token ' + access_token
+            raise SystemError(
+                f'Did not find an access token of `{TOKEN_ENV_NAME}`')
+    headers = {'Authorization': 'token ' + access_token}
     if preview is None:
-        _headers['Accept'] = 'application/vnd.github.v3+json'
+        headers['Accept'] = 'application/vnd.github.v3+json'
     else:
-        _headers['Accept'] = f'application/vnd.github.{preview}+json'
-    return _headers
+        headers['Accept'] = f'application/vnd.github.{preview}+json'
+    return headers
 
 
 def cleanup_json_dict(d):
@@ -89,54 +94,164 @@ def cleanup_json_dict(d):
     >>> cleanup_json_dict(d)
     >>> d
     {'b': {'d': 1}}
+    >>> d = {'l': [{'a': None}], 't': datetime(2021, 5, 3, tzinfo=timezone.utc)}
+    >>> cleanup_json_dict(d)
+    >>> d
+    {'l': [{}], 't': '2021-05-03T00:00:00Z'}
     """
 
     for k, v in list(d.items()):
-        if isinstance(v, dict):
-            cleanup_json_dict(v)
-        elif v is None:
+        if v is None:
             del d[k]
-        elif isinstance(v, enum.Enum):
-            d[k] = v.value
-        elif isinstance(v, datetime):
-            d[k] = fromisoformat(v)
+        else:
+            d[k] = _cleanup_json_value(v)
 
 
-def send_github_json(url, mode, json_data=None, preview=None):
-    assert mode in ('GET', 'POST', 'PATCH', 'DELETE'), f"Unknown mode {mode}"
+def _cleanup_json_value(v):
+    if isinstance(v, dict):
+        cleanup_json_dict(v)
+    elif isinstance(v, list):
+        for i, item in enumerate(v):
+            v[i] = _cleanup_json_value(item)
+    elif isinstance(v, enum.Enum):
+        return v.value
+    elif isinstance(v, datetime):
+        return toisoformat(v)
+    return v
 
-    if dataclasses.is_dataclass(json_data):
-        json_data = dataclasses.asdict(json_data)
-        cleanup_json_dict(json_data)
 
-    kw = {
-        'url': url,
-        'headers': github_headers(preview=preview),
-    }
-    if mode == 'POST':
-        f = requests.post
-        assert json_data is not None, json_data
-        kw['json'] = json_data
-    elif mode == 'PATCH':
-        f = requests.patch
+def prepare_github_request(mode, json_data=None, preview=None):
+    """Validate and encode a request, returning `(json_data, headers)`."""
+    assert mode in ('GET', 'POST', 'PATCH', 'PUT', 'DELETE'), f"Unknown mode {mode}"
+
+    if hasattr(type(json_data), '__dataclass_fields__'):
+        from . import encoder
+        json_data = encoder.encode(json_data)
+
+    if mode in ('POST', 'PATCH', 'PUT'):
         assert json_data is not None, json_data
-        kw['json'] = json_data
-    elif mode == 'GET':
-        assert json_data is None, json_data
-        f = requests.get
-    elif mode == 'DELETE':
+    else:
         assert json_data is None, json_data
-        f = requests.delete
-        return f(**kw).json()
 
-    json_data = f(**kw).json()
-    return json_data
+    return json_data, github_headers(preview=preview)
+
+
+def send_github_request(url, mode, json_data=None, preview=None, precheck=None):
+    """Send a request to the GitHub API and return the `requests.Response`.
+
+    Transient failures are retried (see `retry`). A POST is only re-sent if
+    `precheck()` (called before each retry) returns None, otherwise the JSON it
+    returns is used as the response.
+    """
+    from . import ratelimit
+    from . import retry
+
+    json_data, headers = prepare_github_request(mode, json_data, preview)
+    c = client.get_client()
+    if mode == 'GET':
+        send = lambda: cache.cached_get(c, url, headers)
+    else:
+        send = lambda: c.request(mode, url, headers=headers, json=json_data)
+    start = time.perf_counter()
+    try:
+        r = retry.call(mode, url, send, precheck=precheck,
+                       safe=mode != 'POST' or not ratelimit.is_mutation(mode, url, json_data))
+    except retry.GitHubError:
+        telemetry.record_response(mode, url, start)
+        raise
+    telemetry.record_response(mode, url, start, r)
+    return r
+
+
+def decode_json(r, fields=None):
+    """The JSON body of `r` (None if empty), only decoding `fields` if given.
+
+    See `projection` for the format of `fields`.
+    """
+    if r.status_code == 204 or not r.content:
+        return None
+    try:
+        if fields is None:
+            return r.json()
+        return projection.loads(r.content.decode('utf-8'), fields)
+    except ValueError:
+        from . import retry
+        raise retry.GitHubResponseError(r.status_code, r.text)
+
+
+def send_github_json(url, mode, json_data=None, preview=None, precheck=None, fields=None):
+    r = send_github_request(url, mode, json_data, preview=preview, precheck=precheck)
+    return decode_json(r, fields)
 
 
 def get_github_json(url, *args, **kw):
     preview = kw.pop('preview', None)
+    fields = kw.pop('fields', None)
     full_url = url.format(*args, **kw)
-    return send_github_json(full_url, 'GET', preview=preview)
+    return send_github_json(full_url, 'GET', preview=preview, fields=fields)
+
+
+def rate_limit_budget(resource='core'):
+    """Last known `ratelimit.Budget` for the current token (or None)."""
+    return client.get_client().budget(github_headers(), resource)
+
+
+def add_query(url, **params):
+    """
+
+    >>> add_query('https://api.github.com/repos/a/b/pulls', per_page=100)
+    'https://api.github.com/repos/a/b/pulls?per_page=100'
+    >>> add_query('https://api.github.com/repos/a/b/pulls?state=open', per_page=100)
+    'https://api.github.com/repos/a/b/pulls?state=open&per_page=100'
+    >>> add_query('https://api.github.com/repos/a/b/pulls?per_page=5', per_page=100)
+    'https://api.github.com/repos/a/b/pulls?per_page=5'
+    """
+    for k, v in params.items():
+        if v is None or f'?{k}=' in url or f'&{k}=' in url:
+            continue
+        url += ('&' if '?' in url else '?') + f'{k}={v}'
+    return url
+
+
+def iter_github_json(url, *args, **kw):
+    """Yield the items of a list endpoint, fetching pages only as needed.
+
+    Follows the `Link: <...>; rel="next"` headers so every page is seen, while
+    only one page is held in memory at a time. Stop iterating (or pass
+    `max_items`) to avoid fetching any further pages. With `fields` only those
+    fields of each item are decoded (see `projection`), one item at a time.
+    """
+    preview = kw.pop('preview', None)
+    per_page = kw.pop('per_page', 100)
+    max_items = kw.pop('max_items', None)
+    fields = kw.pop('fields', None)
+    if fields is not None:
+        fields = projection.compile_fields(fields)
+
+    if max_items is not None:
+        per_page = max(1, min(per_page, max_items))
+    next_url = add_query(url.format(*args, **kw), per_page=per_page)
+    count = 0
+    while next_url:
+        if max_items is not None and count >= max_items:
+            return
+        r = send_github_request(next_url, 'GET', preview=preview)
+        if fields is None:
+            page = r.json()
+            if not isinstance(page, list):
+                raise SystemError(f'Expected a list from {next_url}, got: {page}')
+        else:
+            text = r.content.decode('utf-8')
+            if not projection.is_array(text):
+                raise SystemError(f'Expected a list from {next_url}, got: {text[:200]}')
+            page = projection.iter_array(text, fields)
+        next_url = r.links.get('next', {}).get('url', None)
+        for item in page:
+            if max_items is not None and count >= max_items:
+                return
+            count += 1
+            yield item
+        del page
 
 
 if __name__ == "__main__":
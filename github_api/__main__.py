@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import importlib
+import pathlib
+import sys
+
+
+"""
+Run one or more actions in a single Python interpreter.
+
+    python3 -m github_api <command> [args...] [-- <command> [args...]]...
+
+Commands are run in order and stop at the first one which fails. Running them
+in one interpreter means startup and imports are only paid once, and the
+pooled connection, rate limit budgets, response cache and decoded event are
+shared between them.
+"""
+
+
+# command -> module with a `main(args)`
+COMMANDS = {
+    'env': 'github_api.env',
+    'send_pr': 'send_pr.action',
+    'link_pr': 'link_pr.action',
+    'remove_label': 'remove_label.action',
+    'clone_from': 'clone_from.action',
+    'push_to': 'push_to.action',
+    'upstream_sync': 'upstream_sync.action',
+}
+
+
+def split_commands(args):
+    """
+    >>> split_commands(['env', '--quiet', '--', 'send_pr', '--batch', 'api'])
+    [('env', ['--quiet']), ('send_pr', ['--batch', 'api'])]
+    >>> split_commands(['remove_label', '--'])
+    [('remove_label', [])]
+    """
+    commands = []
+    current = []
+    for a in list(args) + ['--']:
+        if a != '--':
+            current.append(a)
+        elif current:
+            commands.append((current[0], current[1:]))
+            current = []
+    return commands
+
+
+def run(name, args):
+    import github_api
+
+    module = importlib.import_module(COMMANDS[name])
+    token_env_name = github_api.TOKEN_ENV_NAME
+    try:
+        return module.main(args)
+    finally:
+        github_api.TOKEN_ENV_NAME = token_env_name
+
+
+def main(args):
+    commands = split_commands(args)
+    if not commands:
+        print('Usage: python3 -m github_api <command> [args...] [-- <command> [args...]]...')
+        print('Commands:', ', '.join(COMMANDS))
+        return 2
+    for name, _ in commands:
+        if name not in COMMANDS:
+            print(f'Unknown command {name!r}, expected one of: {", ".join(COMMANDS)}')
+            return 2
+
+    # The action directories live next to `github_api`.
+    root = str(pathlib.Path(__file__).resolve().parent.parent)
+    if root not in sys.path:
+        sys.path.insert(0, root)
+
+    for name, cmd_args in commands:
+        r = run(name, cmd_args)
+        if r:
+            return r
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+
+import github_api
+
+
+"""
+asyncio counterpart to `send_github_json` / `get_github_json`.
+
+Independent calls can be issued concurrently, with a bound on the number in
+flight, and identical GETs which are in flight at the same time are only sent
+once. Each call runs `send_github_request` in a process wide thread pool, so
+it shares the pooled keep-alive session, rate limit pacing, retries, response
+cache, telemetry and record / replay transport with the sync calls.
+
+From sync code use `gather`;
+
+    deployment, statuses = aio.gather(
+        aio.get_github_json(deployment_url),
+        aio.get_github_json(statuses_url),
+    )
+"""
+
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    """The process wide thread pool the calls run in."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=DEFAULT_MAX_CONCURRENCY, thread_name_prefix='github_api.aio')
+    return _executor
+
+
+class AsyncGitHubClient:
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._sem = None
+        self._inflight = {}
+
+    async def __aenter__(self):
+        self._sem = asyncio.Semaphore(self.max_concurrency)
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def _send(self, url, mode, json_data, preview):
+        """Send a request in the thread pool, with the sync retry policy.
+
+        >>> import os
+        >>> from github_api import client, retry
+        >>> class Flaky:
+        ...     def __init__(self): self.statuses = [502, 200]
+        ...     def request(self, method, url, headers=None, json=None):
+        ...         return retry.json_response(url, {'n': 1}, self.statuses.pop(0))
+        >>> old, old_policy = client.set_client(Flaky()), retry.POLICIES['GET']
+        >>> retry.POLICIES['GET'] = retry.RetryPolicy(backoff=0)
+        >>> old_token = os.environ.get(github_api.TOKEN_ENV_NAME, None)
+        >>> os.environ[github_api.TOKEN_ENV_NAME] = old_token or 'x'
+        >>> gather(get_github_json('https://api.github.com/x'))
+        ::warning::GET https://api.github.com/x failed (status 502), retry 1 in 0.0s.
+        [{'n': 1}]
+        >>> retry.POLICIES['GET'] = old_policy
+        >>> _ = client.set_client(old)
+        >>> if old_token is None:
+        ...     del os.environ[github_api.TOKEN_ENV_NAME]
+        """
+        async with self._sem:
+            return await asyncio.get_running_loop().run_in_executor(
+                executor(), lambda: github_api.send_github_request(url, mode, json_data, preview=preview))
+
+    async def request(self, url, mode, json_data=None, preview=None):
+        if mode != 'GET':
+            return await self._send(url, mode, json_data, preview)
+
+        # Singleflight identical GETs.
+        key = (url, preview, github_api.TOKEN_ENV_NAME)
+        task = self._inflight.get(key, None)
+        if task is None:
+            task = asyncio.ensure_future(self._send(url, mode, None, preview))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def send_github_json(self, url, mode, json_data=None, preview=None, fields=None):
+        r = await self.request(url, mode, json_data, preview=preview)
+        return github_api.decode_json(r, fields)
+
+    async def get_github_json(self, url, *args, **kw):
+        preview = kw.pop('preview', None)
+        fields = kw.pop('fields', None)
+        full_url = url.format(*args, **kw)
+        return await self.send_github_json(full_url, 'GET', preview=preview, fields=fields)
+
+
+_current = contextvars.ContextVar('github_api_aio_client', default=None)
+
+
+def _client():
+    c = _current.get()
+    if c is None:
+        raise RuntimeError(
+            'No AsyncGitHubClient is active, use aio.gather() or `async with AsyncGitHubClient()`.')
+    return c
+
+
+async def send_github_json(url, mode, json_data=None, preview=None, fields=None):
+    return await _client().send_github_json(url, mode, json_data, preview=preview, fields=fields)
+
+
+async def get_github_json(url, *args, **kw):
+    return await _client().get_github_json(url, *args, **kw)
+
+
+async def _gather(aws, max_concurrency):
+    async with AsyncGitHubClient(max_concurrency) as c:
+        token = _current.set(c)
+        try:
+            return await asyncio.gather(*aws)
+        finally:
+            _current.reset(token)
+
+
+def gather(*aws, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """Run the `aio` calls in `aws` concurrently and return their results."""
+    return asyncio.run(_gather(aws, max_concurrency))
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
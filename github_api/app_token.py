@@ -3,12 +3,10 @@
 import json
 import os
 import pathlib
-import pprint
-import requests
 
 from datetime import datetime, timedelta, timezone
 
-import jwt
+from .client import API_URL, get_client
 
 
 GH_APP_PRIVATE_KEY = pathlib.Path(__file__).parent / pathlib.Path("app.private-key.pem")
@@ -18,6 +16,9 @@ def get_bearer_token():
     if not GH_APP_PRIVATE_KEY.exists():
         return None
 
+    # Only needed (and only installed) when running as a GitHub App.
+    import jwt
+
     app_id = os.environ['GITHUB_APP_ID']
 
     with open(GH_APP_PRIVATE_KEY, 'rb') as fh:
@@ -40,23 +41,135 @@ def get_bearer_token():
     return i.encode(payload, private_key, alg="RS256")
 
 
+# Installation tokens are valid for an hour, refresh them this long before
+# they expire.
+REFRESH_MARGIN = timedelta(minutes=5)
+
+# Path of a (0600) file used to share tokens between the steps of a job (for
+# example `$RUNNER_TEMP/github-app-token.json`, which is removed at the end of
+# the job). When unset tokens are only cached in memory.
+TOKEN_CACHE_ENV_NAME = 'GITHUB_APP_TOKEN_CACHE'
+
+
+def _token_cache_path():
+    path = os.environ.get(TOKEN_CACHE_ENV_NAME, None)
+    return pathlib.Path(path) if path else None
+
+
+class TokenCache:
+    """Installation ids and access tokens, keyed by app id.
+
+    >>> import tempfile
+    >>> p = pathlib.Path(tempfile.mkdtemp()) / 'tokens.json'
+    >>> c = TokenCache(p)
+    >>> c.token('1', 2) is None
+    True
+    >>> c.set_installation('1', 'a/b', 2, 'https://x/2/access_tokens')
+    >>> c.set_token('1', 2, 'tok', datetime.now(timezone.utc) + timedelta(hours=1))
+    >>> TokenCache(p).installation('1', 'a/b')
+    [2, 'https://x/2/access_tokens']
+    >>> TokenCache(p).token('1', 2)
+    'tok'
+    >>> oct(p.stat().st_mode & 0o777)
+    '0o600'
+    >>> c.set_token('1', 2, 'old', datetime.now(timezone.utc) + timedelta(minutes=1))
+    >>> c.token('1', 2) is None
+    True
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.data = {'installations': {}, 'tokens': {}}
+        if path is not None and path.exists():
+            try:
+                with open(path) as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+    def installation(self, app_id, slug):
+        return self.data['installations'].get(f'{app_id}:{slug}', None)
+
+    def set_installation(self, app_id, slug, install_id, access_tokens_url):
+        self.data['installations'][f'{app_id}:{slug}'] = [install_id, access_tokens_url]
+        self._save()
+
+    def token(self, app_id, install_id):
+        t = self.data['tokens'].get(f'{app_id}:{install_id}', None)
+        if t is None:
+            return None
+        expires_at = datetime.fromisoformat(t['expires_at'].replace('Z', '+00:00'))
+        if expires_at - REFRESH_MARGIN <= datetime.now(timezone.utc):
+            return None
+        return t['token']
+
+    def set_token(self, app_id, install_id, token, expires_at):
+        self.data['tokens'][f'{app_id}:{install_id}'] = {
+            'token': token,
+            'expires_at': expires_at.isoformat(),
+        }
+        self._save()
+
+    def _save(self):
+        if self.path is None:
+            return
+        tmp = self.path.with_name(self.path.name + f'.{os.getpid()}.tmp')
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.data, f)
+        os.replace(tmp, self.path)
+
+
+_token_cache = None
+
+
+def get_token_cache():
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = TokenCache(_token_cache_path())
+    return _token_cache
+
+
 def get_token(slug=os.environ.get('GITHUB_REPOSITORY', None)):
     assert slug is not None
-    headers = {
-        "Accept": "application/vnd.github.v3+json",
-        "Authorization": "Bearer "+get_bearer_token(),
-    }
-    install_data = requests.get(
-        url=f"https://api.github.com/repos/{slug}/installation",
-        headers=headers,
-    ).json()
-
-    install_id = install_data['id']
+    if not GH_APP_PRIVATE_KEY.exists():
+        return None
 
-    access_data = requests.post(
-        url=install_data['access_tokens_url'],
-        headers=headers,
+    app_id = os.environ['GITHUB_APP_ID']
+    cache = get_token_cache()
+
+    bearer = []
+    def headers():
+        # Only sign a JWT if we actually need to talk to the API.
+        if not bearer:
+            bearer.append(get_bearer_token())
+        return {
+            "Accept": "application/vnd.github.v3+json",
+            "Authorization": "Bearer "+bearer[0],
+        }
+
+    install = cache.installation(app_id, slug)
+    if install is None:
+        install_data = get_client().request(
+            'GET',
+            f"{API_URL}/repos/{slug}/installation",
+            headers=headers(),
+        ).json()
+        install = [install_data['id'], install_data['access_tokens_url']]
+        cache.set_installation(app_id, slug, *install)
+    install_id, access_tokens_url = install
+
+    token = cache.token(app_id, install_id)
+    if token is not None:
+        return token
+
+    access_data = get_client().request(
+        'POST',
+        access_tokens_url,
+        headers=headers(),
     ).json()
+    expires_at = datetime.fromisoformat(access_data['expires_at'].replace('Z', '+00:00'))
+    cache.set_token(app_id, install_id, access_data['token'], expires_at)
     return access_data['token']
 
 
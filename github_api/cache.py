@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+
+import hashlib
+import json
+import os
+import pathlib
+import re
+import tempfile
+import threading
+import time
+
+
+"""
+On-disk conditional request (ETag / Last-Modified) cache for GitHub API GETs.
+
+Responses are stored keyed by URL, `Accept` header and a hash of the token
+used, then replayed with `If-None-Match` / `If-Modified-Since`. GitHub does not
+count `304 Not Modified` replies against the rate limit.
+
+Set `GITHUB_API_CACHE_DIR` to enable the cache. The directory can be saved and
+restored between workflow runs with `actions/cache`.
+"""
+
+
+CACHE_DIR_ENV_NAME = 'GITHUB_API_CACHE_DIR'
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+# List of (url regex, seconds) pairs. Within the TTL a cached response is used
+# without contacting GitHub at all; after it the response is revalidated.
+DEFAULT_TTLS = (
+    # Repository metadata (name, parent, default branch) rarely changes.
+    (r'/repos/[^/]+/[^/]+$', 60 * 60),
+)
+
+# Response headers which are kept with the cached body.
+_KEEP_HEADERS = ('ETag', 'Last-Modified', 'Link', 'Content-Type')
+
+
+class ResponseCache:
+    """Size capped, LRU evicted store of GitHub API responses.
+
+    >>> import tempfile
+    >>> c = ResponseCache(tempfile.mkdtemp(), ttls=[(r'/zen$', 60)])
+    >>> k = c.key('https://api.github.com/zen', 'application/json', 'token abc')
+    >>> c.get(k) is None
+    True
+    >>> c.put(k, 'https://api.github.com/zen', {'ETag': '"x"'}, b'"hi"')
+    >>> e = c.get(k)
+    >>> e['headers'], e['body']
+    ({'ETag': '"x"'}, b'"hi"')
+    >>> c.is_fresh(e)
+    True
+    >>> c.ttl_for('https://api.github.com/repos/a/b/pulls')
+    0
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, ttls=DEFAULT_TTLS):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttls = [(re.compile(p), t) for p, t in ttls]
+        self._lock = threading.Lock()
+        self._size = sum(p.stat().st_size for p in self.directory.glob('*.json'))
+
+    @staticmethod
+    def key(url, accept, authorization):
+        h = hashlib.sha256()
+        for v in (url, accept, hashlib.sha256(authorization.encode('utf-8')).hexdigest()):
+            h.update(v.encode('utf-8'))
+            h.update(b'\0')
+        return h.hexdigest()
+
+    def ttl_for(self, url):
+        path = url.split('?', 1)[0]
+        for regex, ttl in self.ttls:
+            if regex.search(path):
+                return ttl
+        return 0
+
+    def is_fresh(self, entry):
+        return time.time() - entry['stored_at'] < self.ttl_for(entry['url'])
+
+    def _path(self, key):
+        return self.directory / (key + '.json')
+
+    def get(self, key):
+        p = self._path(key)
+        try:
+            with open(p, 'rb') as f:
+                entry = json.load(f)
+            # Bump the mtime, which is used as the LRU order.
+            os.utime(p)
+        except (OSError, ValueError):
+            return None
+        entry['body'] = entry['body'].encode('utf-8')
+        return entry
+
+    def put(self, key, url, headers, body, stored_at=None):
+        entry = {
+            'url': url,
+            'stored_at': time.time() if stored_at is None else stored_at,
+            'headers': {k: headers[k] for k in _KEEP_HEADERS if k in headers},
+            'body': body.decode('utf-8'),
+        }
+        data = json.dumps(entry).encode('utf-8')
+        p = self._path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        with self._lock:
+            try:
+                self._size -= p.stat().st_size
+            except OSError:
+                pass
+            os.replace(tmp, p)
+            self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def touch(self, key, entry):
+        """Mark an entry as revalidated (after a `304 Not Modified`)."""
+        self.put(key, entry['url'], entry['headers'], entry['body'])
+
+    def _evict(self):
+        entries = []
+        for p in self.directory.glob('*.json'):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort()
+        self._size = sum(e[1] for e in entries)
+        # Evict down to 90% so we don't rescan on every put.
+        while entries and self._size > self.max_bytes * 0.9:
+            _, size, p = entries.pop(0)
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            self._size -= size
+
+
+def to_response(url, entry):
+    """Build a `requests.Response` from a cache entry."""
+    import requests
+    r = requests.models.Response()
+    r.url = url
+    r.status_code = 200
+    r.reason = 'OK'
+    r.headers = requests.structures.CaseInsensitiveDict(entry['headers'])
+    r._content = entry['body']
+    r.encoding = 'utf-8'
+    r.from_cache = True
+    return r
+
+
+_cache = None
+
+
+def get_cache():
+    """Returns the process wide cache, or None if it isn't enabled."""
+    global _cache
+    if _cache is None:
+        directory = os.environ.get(CACHE_DIR_ENV_NAME, None)
+        if not directory:
+            return None
+        _cache = ResponseCache(directory)
+    return _cache
+
+
+def set_cache(cache):
+    """Replace the process wide cache (returns the previous one)."""
+    global _cache
+    old, _cache = _cache, cache
+    return old
+
+
+def prepare_get(url, headers):
+    """Look up `url` in the cache before sending a GET.
+
+    Returns `(response, state)`. If `response` is not None it is a fresh
+    cached response and no request is needed. Otherwise send the request with
+    `state.headers` and pass the result to `finish_get(state, response)`.
+    """
+    cache = get_cache()
+    if cache is None:
+        return None, _GetState(None, None, None, url, headers)
+
+    key = cache.key(url, headers.get('Accept', ''), headers.get('Authorization', ''))
+    entry = cache.get(key)
+    if entry is not None:
+        if cache.is_fresh(entry):
+            return to_response(url, entry), None
+        headers = dict(headers)
+        if 'ETag' in entry['headers']:
+            headers['If-None-Match'] = entry['headers']['ETag']
+        if 'Last-Modified' in entry['headers']:
+            headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+    return None, _GetState(cache, key, entry, url, headers)
+
+
+def finish_get(state, r):
+    """Store (or replay on a `304`) the response to a prepared GET."""
+    if state.cache is None:
+        return r
+    if r.status_code == 304 and state.entry is not None:
+        state.cache.touch(state.key, state.entry)
+        return to_response(state.url, state.entry)
+
+    r.from_cache = False
+    if r.status_code == 200 and ('ETag' in r.headers or 'Last-Modified' in r.headers):
+        state.cache.put(state.key, state.url, r.headers, r.content)
+    return r
+
+
+class _GetState:
+    __slots__ = ('cache', 'key', 'entry', 'url', 'headers')
+
+    def __init__(self, cache, key, entry, url, headers):
+        self.cache = cache
+        self.key = key
+        self.entry = entry
+        self.url = url
+        self.headers = headers
+
+
+def cached_get(client, url, headers):
+    """GET `url` using the cache for conditional requests when enabled."""
+    response, state = prepare_get(url, headers)
+    if response is not None:
+        return response
+    return finish_get(state, client.request('GET', url, headers=state.headers))
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+
+import os
+import threading
+
+
+"""
+Shared, pooled HTTP client used for all GitHub API calls.
+
+Using a single `requests.Session` means consecutive calls to the API reuse the
+same keep-alive TCP+TLS connection rather than paying for a new handshake on
+every request.
+
+`requests` (and the rate limiting, retry and transport modules built on it) are
+only imported once the first request is made, so importing `github_api` stays
+cheap for actions which don't talk to the API.
+"""
+
+
+# Set by GitHub Actions, points at the GitHub Enterprise Server API when used
+# there.
+API_URL = os.environ.get('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+
+# (connect, read) timeouts in seconds.
+DEFAULT_TIMEOUT = (
+    float(os.environ.get('GITHUB_API_CONNECT_TIMEOUT', 10)),
+    float(os.environ.get('GITHUB_API_READ_TIMEOUT', 60)),
+)
+
+USER_AGENT = 'The-OpenROAD-Project/actions'
+
+
+class GitHubClient:
+    """Reusable HTTP client with a bounded connection pool.
+
+    >>> c = GitHubClient(timeout=5, pool_maxsize=2)
+    >>> c.timeout
+    5
+    >>> c.session.headers['Accept-Encoding']
+    'gzip, deflate'
+    >>> c.session.get_adapter('https://api.github.com')._pool_maxsize
+    2
+    >>> c.close()
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, pool_connections=4, pool_maxsize=16,
+                 ratelimiter=None):
+        self.timeout = timeout
+        if ratelimiter is None:
+            from . import ratelimit
+            ratelimiter = ratelimit.RateLimiter(
+                mutation_interval=float(os.environ.get('GITHUB_API_MUTATION_INTERVAL', 1.0)))
+        self.ratelimiter = ratelimiter
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._new_session()
+        return self._session
+
+    def _new_session(self):
+        import requests
+        from . import transport
+
+        s = requests.Session()
+        # Block rather than open extra (unpooled) connections when every
+        # pooled connection is busy.
+        adapter = transport.adapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=True,
+        )
+        s.mount('https://', adapter)
+        s.mount('http://', adapter)
+        s.headers['Accept-Encoding'] = 'gzip, deflate'
+        s.headers['User-Agent'] = USER_AGENT
+        return s
+
+    def request(self, method, url, headers=None, json=None, timeout=None):
+        from . import ratelimit
+        limiter = self.ratelimiter
+        token = ratelimit.token_id(headers)
+        resource = ratelimit.resource_for(url)
+        attempt = 0
+        while True:
+            # GraphQL reads are POSTs, but aren't paced as mutations.
+            limiter.wait(token, resource, method if ratelimit.is_mutation(method, url, json) else 'GET')
+            r = self.session.request(
+                method,
+                url,
+                headers=headers,
+                json=json,
+                timeout=self.timeout if timeout is None else timeout,
+            )
+            limiter.update(token, r)
+            delay = limiter.retry_delay(r, attempt)
+            if delay is None or attempt >= limiter.max_retries:
+                return r
+            attempt += 1
+            print(f"::warning::Rate limited on {method} {url} ({r.status_code}),"
+                  f" retry {attempt} in {delay:.0f}s.", flush=True)
+            limiter.sleep(delay)
+
+    def budget(self, headers, resource='core'):
+        """Last known rate limit budget for the token in `headers`."""
+        from . import ratelimit
+        return self.ratelimiter.budget(ratelimit.token_id(headers), resource)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+_client = None
+
+
+def get_client():
+    """Returns the process wide client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = GitHubClient()
+    return _client
+
+
+def set_client(client):
+    """Replace the process wide client (returns the previous one)."""
+    global _client
+    old, _client = _client, client
+    return old
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -19,20 +19,38 @@
 
 
 import enum
+import functools
 import json
 import pprint
 import dataclasses
+import os
+import pathlib
+import sys
+import tempfile
+import threading
+import urllib.parse
 
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Optional, List
 
+from . import API_URL, fromisoformat, iter_github_json
+
 
 """
 Small library for working with GitHub Check Runs / Suites.
 """
 
 
+# Use `__slots__` for the (many) decoded records when supported.
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+# Deployments and statuses share a small set of timestamps, so only parse
+# each one once.
+_timestamp = functools.lru_cache(maxsize=4096)(fromisoformat)
+
+
 def datetime_field():
     return field(
     #    metadata=config(
@@ -58,7 +76,7 @@ class DeploymentState(enum.Enum):
     success     = 'success'
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class DeploymentStatus:
     id: int
     node_id: str
@@ -80,7 +98,7 @@ class DeploymentStatus:
     #repository_url: str = None # "https://api.github.com/repos/octocat/example"
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class Deployment:
     url: str
 
@@ -114,7 +132,7 @@ class Deployment:
         d = dataclasses.asdict(object)
         toremove = []
         for k, v in d.items():
-            if isinstance(v, str) and 'api.github.com' in v:
+            if isinstance(v, str) and API_URL in v:
                 toremove.append(k)
         for k in toremove:
             del d[k]
@@ -125,6 +143,50 @@ class Deployment:
 pprint.PrettyPrinter._dispatch[Deployment.__repr__] = Deployment._pprint
 
 
+_DEPLOYMENT_FIELDS = tuple(f.name for f in dataclasses.fields(Deployment))
+_DEPLOYMENT_STATUS_FIELDS = tuple(f.name for f in dataclasses.fields(DeploymentStatus))
+
+
+def decode_deployment(j):
+    """Decode an API deployment, ignoring any fields we don't know about.
+
+    >>> d = decode_deployment({'url': 'u', 'id': 1, 'node_id': 'n', 'sha': 's',
+    ...     'environment': 'e', 'created_at': '2021-05-03T01:48:37Z',
+    ...     'updated_at': None, 'brand_new_field': 1})
+    >>> d.id, d.environment, d.created_at, d.updated_at
+    (1, 'e', datetime.datetime(2021, 5, 3, 1, 48, 37, tzinfo=datetime.timezone.utc), None)
+    """
+    # Fill the fields positionally, anything missing from `j` becomes None.
+    d = Deployment(*map(j.get, _DEPLOYMENT_FIELDS))
+    d.created_at = _timestamp(d.created_at)
+    d.updated_at = _timestamp(d.updated_at)
+    return d
+
+
+def decode_deployments(page):
+    """Decode a page (list) of API deployments."""
+    return [decode_deployment(j) for j in page]
+
+
+def decode_deployment_status(j):
+    """Decode an API deployment status, ignoring any fields we don't know about.
+
+    >>> decode_deployment_status({'id': 1, 'node_id': 'n', 'state': 'success',
+    ...     'creator': {}, 'created_at': None, 'extra': True}).state
+    <DeploymentState.success: 'success'>
+    """
+    kw = {k: j[k] for k in _DEPLOYMENT_STATUS_FIELDS if k in j}
+    kw['state'] = DeploymentState(j['state'])
+    kw['created_at'] = _timestamp(j.get('created_at', None))
+    kw['updated_at'] = _timestamp(j.get('updated_at', None))
+    return DeploymentStatus(**kw)
+
+
+def decode_deployment_statuses(page):
+    """Decode a page (list) of API deployment statuses."""
+    return [decode_deployment_status(j) for j in page]
+
+
 # https://docs.github.com/en/rest/reference/repos#create-a-deployment-status
 
 @dataclass
@@ -178,6 +240,134 @@ class DeploymentCreate:
 pprint.PrettyPrinter._dispatch[DeploymentCreate.__repr__] = DeploymentCreate._pprint
 
 
+
+# Fields of a deployment kept in the persisted `DeploymentIndex`.
+INDEX_FIELDS = (
+    'url', 'id', 'node_id', 'sha', 'ref', 'task', 'environment',
+    'created_at', 'updated_at', 'statuses_url',
+)
+
+
+class DeploymentIndex:
+    """Map of environment to the latest deployment in a repository.
+
+    Lookups query GitHub for just the environment (newest first, one item)
+    so finding a deployment takes one API call no matter how many
+    environments the repository has. Records seen are merged into a map which
+    is persisted in `GITHUB_API_CACHE_DIR` when that is set.
+
+    >>> i = DeploymentIndex('a/b', path=None)
+    >>> i.update([
+    ...     {'url': 'u', 'id': 1, 'node_id': 'n', 'sha': 'old', 'environment': 'e',
+    ...      'updated_at': '2021-05-03T01:00:00Z', 'creator': {}},
+    ...     {'url': 'u', 'id': 2, 'node_id': 'n', 'sha': 'new', 'environment': 'e',
+    ...      'updated_at': '2021-05-04T01:00:00Z'},
+    ... ])
+    >>> i.update([{'url': 'u', 'id': 1, 'node_id': 'n', 'sha': 'old', 'environment': 'e',
+    ...     'updated_at': '2021-05-03T01:00:00Z'}])
+    >>> i.get('e').sha, i.get('missing')
+    ('new', None)
+    """
+
+    def __init__(self, slug, path=False):
+        self.slug = slug
+        if path is False:
+            directory = os.environ.get('GITHUB_API_CACHE_DIR', None)
+            path = None
+            if directory:
+                path = pathlib.Path(directory) / f"deployments-{slug.replace('/', '-')}.json"
+        self.path = path
+        self.environments = {}
+        self._lock = threading.Lock()
+        if path is not None and path.exists():
+            try:
+                with open(path) as f:
+                    self.environments = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+    @property
+    def url(self):
+        return f'{API_URL}/repos/{self.slug}/deployments'
+
+    @staticmethod
+    def _newer(a, b):
+        ka = (_timestamp(a.get('updated_at', None)) or _timestamp(a.get('created_at', None)), a['id'])
+        kb = (_timestamp(b.get('updated_at', None)) or _timestamp(b.get('created_at', None)), b['id'])
+        if ka[0] is None or kb[0] is None:
+            return ka[1] > kb[1]
+        return ka > kb
+
+    def update(self, deployments):
+        """Merge API deployment records into the index."""
+        with self._lock:
+            changed = False
+            for j in deployments:
+                env = j.get('environment', None)
+                if env is None:
+                    continue
+                current = self.environments.get(env, None)
+                if current is None or (current['id'] != j['id'] and self._newer(j, current)):
+                    self.environments[env] = {k: j.get(k, None) for k in INDEX_FIELDS}
+                    changed = True
+            if changed:
+                self._save()
+
+    def _save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.environments, f)
+        os.replace(tmp, self.path)
+
+    def get(self, environment):
+        """Latest known deployment for `environment`, without any API calls."""
+        j = self.environments.get(environment, None)
+        return decode_deployment(j) if j is not None else None
+
+    def query_json(self, environment=None, sha=None, max_items=None, fields=None):
+        """Query deployments filtered server side, newest first, as raw JSON."""
+        params = []
+        if environment is not None:
+            params.append('environment=' + urllib.parse.quote(environment, safe=''))
+        if sha is not None:
+            params.append('sha=' + sha)
+        url = self.url + ('?' + '&'.join(params) if params else '')
+        seen = []
+        try:
+            for j in iter_github_json(url, preview='ant-man-preview', max_items=max_items, fields=fields):
+                seen.append(j)
+                yield j
+        finally:
+            self.update(seen)
+
+    def scan(self):
+        """Fill the index from a paged scan of every deployment.
+
+        Deployment pages are small, so they are decoded with plain `json`
+        (projecting them costs more CPU than the memory it saves).
+        """
+        for _ in self.query_json():
+            pass
+
+    def query(self, environment=None, sha=None, max_items=None):
+        """Query deployments filtered server side, newest first."""
+        for j in self.query_json(environment, sha, max_items):
+            yield decode_deployment(j)
+
+    def lookup_json(self, environment, sha=None):
+        for j in self.query_json(environment=environment, sha=sha, max_items=1):
+            return j
+        return None
+
+    def lookup(self, environment, sha=None):
+        """Latest deployment for `environment` (optionally at `sha`), or None."""
+        j = self.lookup_json(environment, sha)
+        return decode_deployment(j) if j is not None else None
+
+
 if __name__ == "__main__":
     import doctest
     doctest.testmod()
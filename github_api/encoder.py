@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+import dataclasses
+import enum
+
+from datetime import datetime
+
+from . import toisoformat
+
+
+"""
+Encode request payload dataclasses (such as `deployment.DeploymentCreate`)
+into JSON ready dicts.
+
+The first time a dataclass type is encoded, a function which reads each of its
+fields directly is generated for it (like `dataclasses` does for `__init__`).
+Encoding a payload is then a single pass which;
+
+ * drops fields (and dict values) which are `None`,
+ * replaces enums with their values and datetimes with ISO 8601 strings,
+ * recurses into lists, tuples, dicts and nested dataclasses.
+"""
+
+
+# Values which are already JSON ready.
+_SCALARS = frozenset((str, int, float, bool))
+
+_encoders = {}
+
+
+def encoder(cls):
+    """The (cached) encoding function for dataclass `cls`."""
+    fn = _encoders.get(cls, None)
+    if fn is None:
+        fn = _encoders[cls] = _make_encoder(cls)
+    return fn
+
+
+def _make_encoder(cls):
+    lines = ['def encode_fields(o):', '    d = {}']
+    for f in dataclasses.fields(cls):
+        lines.append(f'    v = o.{f.name}')
+        lines.append('    if v is not None:')
+        lines.append(f'        d[{f.name!r}] = v if v.__class__ in SCALARS else encode_value(v)')
+    lines.append('    return d')
+    namespace = {'SCALARS': _SCALARS, 'encode_value': encode}
+    exec('\n'.join(lines), namespace)
+    fn = namespace['encode_fields']
+    fn.__qualname__ = f'encode_{cls.__name__}'
+    return fn
+
+
+def encode(v):
+    """Encode `v` (a dataclass or any value inside one) as JSON ready data.
+
+    >>> @dataclasses.dataclass
+    ... class Example:
+    ...     state: enum.Enum
+    ...     when: datetime = None
+    ...     items: list = dataclasses.field(default_factory=list)
+    >>> class State(enum.Enum):
+    ...     success = 'success'
+    >>> encode(Example(State.success, items=[Example(State.success, datetime(2021, 5, 3))]))
+    {'state': 'success', 'items': [{'state': 'success', 'when': '2021-05-03T00:00:00Z', 'items': []}]}
+    """
+    cls = v.__class__
+    if cls in _SCALARS or v is None:
+        return v
+    fn = _encoders.get(cls, None)
+    if fn is not None:
+        return fn(v)
+    if isinstance(v, enum.Enum):
+        return encode(v.value)
+    if isinstance(v, datetime):
+        return toisoformat(v)
+    if isinstance(v, (list, tuple)):
+        return [encode(i) for i in v]
+    if isinstance(v, dict):
+        return {k: encode(i) for k, i in v.items() if i is not None}
+    if dataclasses.is_dataclass(cls):
+        return encoder(cls)(v)
+    return v
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -19,17 +19,20 @@
 
 
 import codecs
+import collections.abc
 import dataclasses
+import functools
 import io
 import json
 import os
 import pathlib
-import pprint
 import sys
 
 from typing import Optional
 
-from . import get_github_json
+from . import log
+from . import repos
+from . import telemetry
 
 
 @dataclasses.dataclass
@@ -53,6 +56,137 @@ class Repo:
         return f"https://github.com/{self.slug}/pull/{self.pr}"
 
 
+def _json_loads():
+    try:
+        import orjson
+        return orjson.loads
+    except ImportError:
+        return json.loads
+
+
+class Event(collections.abc.Mapping):
+    """GitHub Actions event payload, decoded on first access.
+
+    Works as a read only `dict` of the payload and has properties for the
+    fields the actions use.
+
+    >>> e = Event(b'{"pull_request": {"number": 3, "title": "T", "body": null,'
+    ...     b' "user": {"login": "u"}, "head": {"ref": "b", "sha": "abc",'
+    ...     b' "repo": {"name": "r", "owner": {"login": "o"}}}},'
+    ...     b' "repository": {"full_name": "o/r"}, "label": {"name": "l"}}')
+    >>> e.number, e.branch, e.sha, e.title, e.body, e.user, e.label
+    (3, 'b', 'abc', 'T', None, 'u', 'l')
+    >>> e.head_owner, e.head_repo_name, e.repository
+    ('o', 'r', 'o/r')
+    >>> 'pull_request' in e, e['pull_request']['number']
+    (True, 3)
+    >>> e = Event.from_json({'ref': 'main', 'repository': {'name': 'r', 'owner': {'login': 'o'}}})
+    >>> e.number, e.branch, e.sha, e.head_owner
+    (None, 'main', None, 'o')
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._json = None
+
+    @classmethod
+    def from_json(cls, event_json):
+        e = cls(None)
+        e._json = event_json
+        return e
+
+    @property
+    def json(self):
+        if self._json is None:
+            self._json = _json_loads()(self.raw)
+        return self._json
+
+    def __getitem__(self, k):
+        return self.json[k]
+
+    def __iter__(self):
+        return iter(self.json)
+
+    def __len__(self):
+        return len(self.json)
+
+    @property
+    def pull_request(self) -> Optional[dict]:
+        return self.json.get('pull_request', None)
+
+    @property
+    def head_repo(self) -> dict:
+        if self.pull_request:
+            return self.pull_request['head']['repo']
+        return self.json['repository']
+
+    @property
+    def head_owner(self) -> str:
+        return self.head_repo['owner']['login']
+
+    @property
+    def head_repo_name(self) -> str:
+        return self.head_repo['name']
+
+    @property
+    def repository(self) -> Optional[str]:
+        return self.json.get('repository', {}).get('full_name', None)
+
+    @property
+    def branch(self) -> Optional[str]:
+        if self.pull_request:
+            return self.pull_request['head']['ref']
+        return self.json.get('ref', None)
+
+    @property
+    def sha(self) -> Optional[str]:
+        if self.pull_request:
+            return self.pull_request['head']['sha']
+        return None
+
+    @property
+    def number(self) -> Optional[int]:
+        if self.pull_request:
+            return self.pull_request['number']
+        return None
+
+    @property
+    def title(self) -> Optional[str]:
+        return (self.pull_request or {}).get('title', None)
+
+    @property
+    def body(self) -> Optional[str]:
+        return (self.pull_request or {}).get('body', None)
+
+    @property
+    def user(self) -> Optional[str]:
+        return ((self.pull_request or {}).get('user', None) or {}).get('login', None)
+
+    @property
+    def label(self) -> Optional[str]:
+        return (self.json.get('label', None) or {}).get('name', None)
+
+    def summary(self):
+        return {
+            'repository': self.repository,
+            'head': f'{self.head_owner}/{self.head_repo_name}',
+            'branch': self.branch,
+            'sha': self.sha,
+            'number': self.number,
+            'title': self.title,
+            'user': self.user,
+            'label': self.label,
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def _read_event(path):
+    # Several actions can run in one interpreter (see `github_api.__main__`),
+    # they share one copy of the (lazily decoded) event.
+    with open(path, 'rb') as f:
+        return Event(f.read())
+
+
 def get_event_json(debug=(os.environ.get('ACTIONS_STEP_DEBUG', None)=='true')):
     event_json_path = os.environ.get('GITHUB_EVENT_PATH', None)
     if not event_json_path:
@@ -62,33 +196,24 @@ def get_event_json(debug=(os.environ.get('ACTIONS_STEP_DEBUG', None)=='true')):
     if not event_json_path.exists():
         raise SystemError(f"Path {event_json_path} was not found.")
 
-    with open(event_json_path) as f:
-        event_json = json.load(f)
+    event_json = _read_event(event_json_path)
 
     if debug:
         print()
-        print("::group::Event JSON raw")
-        print(open(event_json_path).read())
-        print("::endgroup::")
-        print()
-        print("::group::Event JSON details")
-        pprint.pprint(event_json)
-        print("::endgroup::")
+        # The full event is only decoded (and printed, capped) when debugging.
+        log.dump("Event JSON", event_json, log.DEBUG)
+        log.dump("Event JSON details", event_json.summary)
         print(flush=True)
     return event_json
 
 
-def get_repo_default_name(key, private, _cache={}):
+def get_repo_default_name(key, private):
     if key in os.environ:
         return os.environ[key]
 
-    if key not in _cache:
-        repo_json = get_github_json(f'https://api.github.com/repos/{private.slug}')
-        if 'parent' in repo_json:
-            _cache[key] = repo_json['parent']['name']
-        else:
-            _cache[key] = repo_json['name']
-    return _cache[key]
+    # Looked up by slug in the shared store, so the staging and upstream names
+    # (and other processes in the job) reuse the same `/repos/{slug}` fetch.
+    return repos.get_store().parent(private.slug).name
 
 
 def details(event_json=None):
@@ -119,24 +244,17 @@ def details(event_json=None):
             os.environ.get('ROT13_UPSTREAM_BRANCH'), 'rot_13')
 
     if event_json:
-        if 'pull_request' in event_json:
-            repo_json = event_json['pull_request']['head']['repo']
-            branch = event_json['pull_request']['head']['ref']
-            pr = event_json['pull_request']['number']
-            pr_sha = event_json['pull_request']['head']['sha']
-        else:
-            repo_json = event_json['repository']
-            branch = event_json['ref']
-            pr = None
-            pr_sha = None
-
+        if not isinstance(event_json, Event):
+            event_json = Event.from_json(event_json)
+        pr_sha = event_json.sha
         private_defaults = Repo(
-            owner = repo_json['owner']['login'],
-            repo = repo_json['name'],
-            branch = branch,
-            pr = pr,
+            owner = event_json.head_owner,
+            repo = event_json.head_repo_name,
+            branch = event_json.branch,
+            pr = event_json.number,
         )
     else:
+        pr_sha = None
         private_defaults = Repo(
             owner = None,
             repo = None,
@@ -197,16 +315,53 @@ def details(event_json=None):
     return (private, staging, upstream, pr_sha)
 
 
+OUTPUT_ENV_NAME = 'GITHUB_OUTPUT'
+
+
+def set_output(name, value):
+    """Set a step output, through `$GITHUB_OUTPUT` when the runner provides it."""
+    output = os.environ.get(OUTPUT_ENV_NAME)
+    if output:
+        with open(output, 'a') as f:
+            print(f"{name}={value}", file=f)
+    else:
+        print(f"::set-output name={name}::{value}")
+
+
+@telemetry.instrument('env.main')
 def main(args):
+    """
+    `--quiet` only prints the results, `--output=<file>` appends the results to
+    `<file>` (for example `$GITHUB_ENV`) rather than printing them.
+    """
+    args = list(args)
+    output = None
+    for a in list(args):
+        if a.startswith('--output='):
+            args.remove(a)
+            output = a.split('=', 1)[1]
     sys_stdout = sys.stdout
     if '--quiet' in args:
         args.remove('--quiet')
         sys.stdout = io.StringIO()
-    event_json = get_event_json(sys_stdout == sys.stdout)
-    private, staging, upstream, pr_sha = details(event_json)
+    try:
+        event_json = get_event_json(sys_stdout == sys.stdout)
+        private, staging, upstream, pr_sha = details(event_json)
+    finally:
+        # Restored as other actions may run next in the same interpreter.
+        sys.stdout = sys_stdout
+
+    if output is not None:
+        with open(output, 'a') as f:
+            _print_results(args, private, staging, upstream, pr_sha, f)
+    else:
+        _print_results(args, private, staging, upstream, pr_sha, sys_stdout)
+
+
+def _print_results(args, private, staging, upstream, pr_sha, file):
     if args:
         for a in args:
-            print(eval(a), file=sys_stdout)
+            print(eval(a), file=file)
     else:
         print(f"""
 PRIVATE_OWNER={private.owner}
@@ -218,7 +373,7 @@ STAGING_BRANCH={staging.branch}
 UPSTREAM_OWNER={upstream.owner}
 UPSTREAM_REPO={upstream.repo}
 UPSTREAM_BRANCH={upstream.branch}
-""".strip(), file=sys_stdout)
+""".strip(), file=file)
 
 
 if __name__ == "__main__":
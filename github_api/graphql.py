@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+
+import json
+import os
+
+from . import API_URL, fromisoformat, send_github_json
+from . import deployment as dapi
+from .env import Repo
+
+
+"""
+GraphQL backend for collapsing several REST round trips into one request.
+
+A single query can return the repository parent names, the pull requests
+associated with a commit and the deployments for an environment with their
+latest status. Results are mapped back onto `env.Repo` and
+`deployment.Deployment` / `deployment.DeploymentStatus`.
+"""
+
+
+GRAPHQL_URL = os.environ.get('GITHUB_GRAPHQL_URL', API_URL + '/graphql')
+
+# Maximum number of aliased sub-queries sent in one request.
+BATCH_SIZE = 50
+
+REPO_FIELDS = """
+name
+owner { login }
+defaultBranchRef { name }
+parent { name owner { login } defaultBranchRef { name } }
+"""
+
+PULL_REQUEST_FIELDS = """
+number
+state
+url
+headRefName
+headRefOid
+baseRefName
+baseRepository { nameWithOwner }
+"""
+
+DEPLOYMENT_FIELDS = """
+databaseId
+id
+commitOid
+ref { name }
+task
+environment
+originalEnvironment
+description
+createdAt
+updatedAt
+latestStatus {
+  id
+  state
+  description
+  environmentUrl
+  logUrl
+  createdAt
+  updatedAt
+  creator { login }
+}
+"""
+
+
+class Raw(str):
+    """A value emitted into the query as-is (for example an enum value)."""
+
+
+def literal(v):
+    """GraphQL literal for a Python value.
+
+    >>> literal('Upstream PR #1')
+    '"Upstream PR #1"'
+    >>> literal(['a', 'b'])
+    '["a", "b"]'
+    >>> literal({'field': Raw('CREATED_AT'), 'direction': Raw('DESC')})
+    '{field: CREATED_AT, direction: DESC}'
+    >>> literal(10)
+    '10'
+    """
+    if isinstance(v, Raw):
+        return str(v)
+    if isinstance(v, (list, tuple)):
+        return '[' + ', '.join(literal(i) for i in v) + ']'
+    if isinstance(v, dict):
+        return '{' + ', '.join(f'{k}: {literal(i)}' for k, i in v.items()) + '}'
+    return json.dumps(v)
+
+
+def field(name, body=None, alias=None, args=None):
+    """Build one (optionally aliased) GraphQL field.
+
+    >>> field('repository', 'name', alias='r0', args={'owner': 'a', 'name': 'b'})
+    'r0: repository(owner: "a", name: "b") { name }'
+    >>> field('name')
+    'name'
+    """
+    s = f'{alias}: {name}' if alias else name
+    if args:
+        s += '(' + ', '.join(f'{k}: {literal(v)}' for k, v in args.items()) + ')'
+    if body:
+        s += ' { ' + ' '.join(body.split()) + ' }'
+    return s
+
+
+def query(*fields):
+    """
+    >>> query(field('viewer', 'login'))
+    'query { viewer { login } }'
+    """
+    return 'query { ' + ' '.join(fields) + ' }'
+
+
+def send_graphql(q):
+    r = send_github_json(GRAPHQL_URL, 'POST', {'query': q})
+    if r.get('errors', None):
+        raise SystemError(f'GraphQL query failed: {r["errors"]}')
+    return r['data']
+
+
+def repository(alias, slug, *fields):
+    owner, name = slug.split('/', 1)
+    return field('repository', ' '.join(fields), alias=alias, args={'owner': owner, 'name': name})
+
+
+def commit_pull_requests(alias, sha, first=10):
+    prs = field('associatedPullRequests', f'nodes {{ {PULL_REQUEST_FIELDS} }}', args={'first': first})
+    return field('object', '... on Commit { ' + prs + ' }', alias=alias, args={'oid': sha})
+
+
+def environment_deployments(alias, environments, first=1):
+    return field(
+        'deployments',
+        f'nodes {{ {DEPLOYMENT_FIELDS} }}',
+        alias=alias,
+        args={
+            'environments': list(environments),
+            'first': first,
+            'orderBy': {'field': Raw('CREATED_AT'), 'direction': Raw('DESC')},
+        },
+    )
+
+
+def to_repo(j, branch=None):
+    """Map a GraphQL repository node onto `env.Repo`."""
+    if not j:
+        return None
+    if branch is None and j.get('defaultBranchRef', None):
+        branch = j['defaultBranchRef']['name']
+    return Repo(owner=j['owner']['login'], repo=j['name'], branch=branch)
+
+
+# GraphQL only states, mapped onto the nearest REST state.
+_STATES = {
+    'WAITING': dapi.DeploymentState.pending,
+    'ACTIVE': dapi.DeploymentState.success,
+    'ABANDONED': dapi.DeploymentState.inactive,
+    'DESTROYED': dapi.DeploymentState.inactive,
+}
+
+
+def to_state(state):
+    """Map a GraphQL deployment (status) state onto `deployment.DeploymentState`.
+
+    >>> to_state('IN_PROGRESS')
+    <DeploymentState.in_progress: 'in_progress'>
+    >>> to_state('WAITING')
+    <DeploymentState.pending: 'pending'>
+    >>> to_state('SOMETHING_NEW')
+    <DeploymentState.pending: 'pending'>
+    """
+    try:
+        return dapi.DeploymentState(state.lower())
+    except ValueError:
+        return _STATES.get(state, dapi.DeploymentState.pending)
+
+
+def to_deployment_status(j):
+    """Map a GraphQL DeploymentStatus node onto `deployment.DeploymentStatus`.
+
+    GraphQL doesn't give the REST id of a status, so `id` is None.
+    """
+    if not j:
+        return None
+    return dapi.DeploymentStatus(
+        id=None,
+        node_id=j['id'],
+        state=to_state(j['state']),
+        creator=j.get('creator', None) or {},
+        description=j.get('description', None),
+        environment_url=j.get('environmentUrl', None),
+        log_url=j.get('logUrl', None),
+        created_at=fromisoformat(j.get('createdAt', None)),
+        updated_at=fromisoformat(j.get('updatedAt', None)),
+    )
+
+
+def to_deployment(slug, j):
+    """Map a GraphQL Deployment node onto `deployment.Deployment`."""
+    url = f'{API_URL}/repos/{slug}/deployments/{j["databaseId"]}'
+    return dapi.Deployment(
+        url=url,
+        id=j['databaseId'],
+        node_id=j['id'],
+        sha=j['commitOid'],
+        ref=(j.get('ref', None) or {}).get('name', None),
+        task=j.get('task', None),
+        original_environment=j.get('originalEnvironment', None),
+        environment=j.get('environment', None),
+        description=j.get('description', None),
+        created_at=fromisoformat(j.get('createdAt', None)),
+        updated_at=fromisoformat(j.get('updatedAt', None)),
+        statuses_url=url + '/statuses',
+        repository_url=f'{API_URL}/repos/{slug}',
+    )
+
+
+class PrState:
+    """Staging / upstream state of one private pull request."""
+
+    def __init__(self, private, parent, pull_requests, deployment, status):
+        self.private = private
+        self.parent = parent
+        self.pull_requests = pull_requests
+        self.deployment = deployment
+        self.status = status
+
+    def __repr__(self):
+        return (f'PrState(private={self.private!r}, parent={self.parent!r},'
+                f' pull_requests={[p["number"] for p in self.pull_requests]!r},'
+                f' deployment={getattr(self.deployment, "id", None)!r},'
+                f' status={getattr(self.status, "state", None)!r})')
+
+
+def _pr_state_fields(n, private_slug, staging_slug, pr_sha, environment):
+    fields = [repository(f'private{n}', private_slug, REPO_FIELDS,
+                         environment_deployments('deployments', [environment]))]
+    if pr_sha:
+        fields.append(repository(f'staging{n}', staging_slug,
+                                 commit_pull_requests('commit', pr_sha)))
+    return fields
+
+
+def _pr_state(data, n, private_slug):
+    p = data[f'private{n}']
+    commit = (data.get(f'staging{n}', None) or {}).get('commit', None) or {}
+    prs = commit.get('associatedPullRequests', {}).get('nodes', [])
+    deployments = p['deployments']['nodes']
+    d = to_deployment(private_slug, deployments[0]) if deployments else None
+    s = to_deployment_status(deployments[0]['latestStatus']) if deployments else None
+    return PrState(to_repo(p), to_repo(p.get('parent', None)), prs, d, s)
+
+
+def fetch_pr_state(private_slug, staging_slug, pr_sha, environment):
+    """Fetch everything needed to link one private PR in a single request.
+
+    Returns a `PrState` with the private repo and its parent, the pull
+    requests associated with `pr_sha` in the staging repository and the most
+    recent deployment (and its latest status) for `environment`.
+    """
+    data = send_graphql(query(*_pr_state_fields(0, private_slug, staging_slug, pr_sha, environment)))
+    return _pr_state(data, 0, private_slug)
+
+
+def batch_pr_states(private_slug, staging_slug, items, batch_size=BATCH_SIZE):
+    """Yield `PrState` for many `(pr_sha, environment)` pairs, batched with aliases."""
+    items = list(items)
+    for start in range(0, len(items), batch_size):
+        chunk = items[start:start+batch_size]
+        fields = []
+        for n, (pr_sha, environment) in enumerate(chunk):
+            fields.extend(_pr_state_fields(n, private_slug, staging_slug, pr_sha, environment))
+        data = send_graphql(query(*fields))
+        for n in range(len(chunk)):
+            yield _pr_state(data, n, private_slug)
+
+
+def fetch_deployment(slug, environment):
+    """The latest deployment for `environment` and its latest status.
+
+    One request in place of looking the deployment up and then fetching it and
+    its statuses. Returns `(deployment, status)`, either of which may be None.
+    """
+    data = send_graphql(query(repository(
+        'repo', slug, environment_deployments('deployments', [environment]))))
+    nodes = data['repo']['deployments']['nodes']
+    if not nodes:
+        return None, None
+    return to_deployment(slug, nodes[0]), to_deployment_status(nodes[0]['latestStatus'])
+
+
+def batch_commit_pull_requests(slug, shas, batch_size=BATCH_SIZE):
+    """The pull requests associated with many commits, returning `{sha: [json]}`."""
+    shas = list(dict.fromkeys(shas))
+    results = {}
+    for start in range(0, len(shas), batch_size):
+        chunk = shas[start:start+batch_size]
+        data = send_graphql(query(repository('repo', slug, *(
+            commit_pull_requests(f'c{n}', sha) for n, sha in enumerate(chunk)))))['repo']
+        for n, sha in enumerate(chunk):
+            commit = data.get(f'c{n}', None) or {}
+            results[sha] = commit.get('associatedPullRequests', {}).get('nodes', [])
+    return results
+
+
+def batch_pull_requests(slug, numbers, fields=PULL_REQUEST_FIELDS, batch_size=BATCH_SIZE):
+    """Fetch many pull requests by number, returning `{number: json}`."""
+    numbers = list(numbers)
+    results = {}
+    for start in range(0, len(numbers), batch_size):
+        chunk = numbers[start:start+batch_size]
+        q = query(repository('repo', slug, *(
+            field('pullRequest', fields, alias=f'pr{n}', args={'number': n}) for n in chunk)))
+        data = send_graphql(q)['repo']
+        for n in chunk:
+            results[n] = data[f'pr{n}']
+    return results
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
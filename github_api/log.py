@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+import collections.abc
+import json
+import os
+import sys
+import threading
+import time
+
+
+"""
+Logging for the action scripts.
+
+ * Records below the current level are dropped before anything is formatted,
+   so debug output of large API responses costs nothing when it is off. The
+   level is `debug` when `ACTIONS_STEP_DEBUG` is `true` (GitHub's "enable
+   debug logging"), otherwise `GITHUB_API_LOG_LEVEL` (default `info`).
+ * `dump()` prints a value in a collapsed `::group::`, capped in depth, items,
+   string length and lines. Anything cut is summarised (`{...18 keys}`,
+   `... 90 more items`) rather than printed.
+ * `GITHUB_API_LOG_JSONL=<file>` also appends every emitted record (with the
+   full value) to `<file>` as JSON lines.
+"""
+
+
+LEVEL_ENV_NAME = 'GITHUB_API_LOG_LEVEL'
+JSONL_ENV_NAME = 'GITHUB_API_LOG_JSONL'
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'error': ERROR}
+_NAMES = {v: k for k, v in LEVELS.items()}
+
+
+class Limits:
+    """How much of a value `render` prints."""
+
+    def __init__(self, depth, items, chars, lines):
+        self.depth = depth
+        self.items = items
+        self.chars = chars
+        self.lines = lines
+
+
+LIMITS = {
+    DEBUG: Limits(depth=6, items=100, chars=2000, lines=1000),
+    INFO: Limits(depth=2, items=20, chars=120, lines=40),
+}
+
+
+def level():
+    if os.environ.get('ACTIONS_STEP_DEBUG', None) == 'true':
+        return DEBUG
+    name = os.environ.get(LEVEL_ENV_NAME, 'info').strip().lower()
+    return LEVELS.get(name, INFO)
+
+
+def enabled(lvl=INFO):
+    return lvl >= level()
+
+
+def _as_data(value):
+    """Plain dicts / lists / scalars for `value`."""
+    if hasattr(type(value), '__dataclass_fields__'):
+        from . import encoder
+        return encoder.encode(value)
+    if isinstance(value, collections.abc.Mapping) and not isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+def _summary(value):
+    if isinstance(value, dict):
+        return f'{{...{len(value)} keys}}'
+    if isinstance(value, (list, tuple)):
+        return f'[...{len(value)} items]'
+    return '...'
+
+
+def _scalar(value, limits):
+    if isinstance(value, str):
+        if len(value) > limits.chars:
+            return repr(value[:limits.chars]) + f'... ({len(value)} chars)'
+        return repr(value)
+    return repr(value)
+
+
+def render(value, limits=LIMITS[INFO]):
+    """Capped, YAML like, lines for `value`.
+
+    >>> v = {'id': 1, 'user': {'login': 'a', 'urls': {'x': 1}}, 'labels': list(range(12))}
+    >>> print('\\n'.join(render(v, Limits(depth=2, items=3, chars=10, lines=20))))
+    id: 1
+    user:
+      login: 'a'
+      urls: {...1 keys}
+    labels:
+      - 0
+      - 1
+      - 2
+      ... 9 more items
+    >>> print('\\n'.join(render({'body': 'x' * 50, 'n': None, 'a': 1, 'b': 2}, Limits(2, 9, 10, 2))))
+    body: 'xxxxxxxxxx'... (50 chars)
+    n: None
+    ... 2 more fields: a, b
+    """
+    lines = []
+    _render(_as_data(value), limits, 0, '', lines)
+    return lines
+
+
+def _full(lines, limits):
+    return len(lines) >= limits.lines
+
+
+def _render(value, limits, depth, indent, lines):
+    if isinstance(value, dict):
+        if not value:
+            lines.append(indent + '{}')
+        for i, (k, v) in enumerate(value.items()):
+            if i >= limits.items or _full(lines, limits):
+                rest = list(value)[i:]
+                names = ', '.join(str(n) for n in rest[:10]) + (', ...' if len(rest) > 10 else '')
+                lines.append(f'{indent}... {len(rest)} more fields: {names}')
+                break
+            v = _as_data(v)
+            if not isinstance(v, (dict, list, tuple)) or not v:
+                lines.append(f'{indent}{k}: {_scalar(v, limits)}')
+            elif depth + 1 >= limits.depth:
+                lines.append(f'{indent}{k}: {_summary(v)}')
+            else:
+                lines.append(f'{indent}{k}:')
+                _render(v, limits, depth + 1, indent + '  ', lines)
+    elif isinstance(value, (list, tuple)):
+        if not value:
+            lines.append(indent + '[]')
+        for i, v in enumerate(value):
+            if i >= limits.items or _full(lines, limits):
+                lines.append(f'{indent}... {len(value) - i} more items')
+                break
+            v = _as_data(v)
+            if not isinstance(v, (dict, list, tuple)) or not v:
+                lines.append(f'{indent}- {_scalar(v, limits)}')
+            elif depth + 1 >= limits.depth:
+                lines.append(f'{indent}- {_summary(v)}')
+            else:
+                start = len(lines)
+                _render(v, limits, depth + 1, indent + '  ', lines)
+                lines[start] = f'{indent}- {lines[start].lstrip()}'
+    else:
+        lines.append(indent + _scalar(value, limits))
+
+
+_lock = threading.Lock()
+_sink = None
+
+
+def _jsonl(lvl, message, value=None, has_value=False):
+    global _sink
+    path = os.environ.get(JSONL_ENV_NAME, None)
+    if not path:
+        return
+    record = {'time': time.time(), 'level': _NAMES.get(lvl, lvl), 'message': message}
+    if has_value:
+        record['value'] = value
+    line = json.dumps(record, default=_json_default)
+    with _lock:
+        if _sink is None or _sink.name != path:
+            _sink = open(path, 'a', buffering=1)
+        _sink.write(line + '\n')
+
+
+def _json_default(o):
+    if isinstance(o, collections.abc.Mapping):
+        return dict(o)
+    from . import encoder
+    v = encoder.encode(o)
+    return repr(o) if v is o else v
+
+
+_PREFIX = {WARNING: '::warning::', ERROR: '::error::', DEBUG: '::debug::'}
+
+
+def log(lvl, message, *args):
+    """Print `message % args` at `lvl`; nothing is formatted if it is dropped."""
+    if lvl < level():
+        return
+    if args:
+        message = message % args
+    print(_PREFIX.get(lvl, '') + message, flush=True)
+    _jsonl(lvl, message)
+
+
+def debug(message, *args):
+    log(DEBUG, message, *args)
+
+
+def info(message, *args):
+    log(INFO, message, *args)
+
+
+def warning(message, *args):
+    log(WARNING, message, *args)
+
+
+def error(message, *args):
+    log(ERROR, message, *args)
+
+
+def dump(title, value, lvl=INFO):
+    """Print `value` in a collapsed group called `title`, within the limits for the level.
+
+    `value` can be a function, which is only called if the group is printed.
+    """
+    current = level()
+    if lvl < current:
+        return
+    if callable(value) and not hasattr(type(value), '__dataclass_fields__'):
+        value = value()
+    limits = LIMITS[DEBUG if current <= DEBUG else INFO]
+    out = sys.stdout
+    print(f'::group::{title}', file=out)
+    for line in render(value, limits):
+        print(line, file=out)
+    print('::endgroup::', file=out, flush=True)
+    _jsonl(lvl, title, value, has_value=True)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+import json
+import re
+
+
+"""
+Decode only the fields of a JSON response which are actually used.
+
+GitHub's list endpoints return large objects (full `owner` / `creator` users,
+`head` / `base` repositories, `_links`, ...) of which the actions read a
+handful of fields. Rather than building the complete nested dicts, the values
+of unwanted keys are skipped over in the response text (with regexes, so
+without creating any Python objects) and only the requested fields are decoded.
+
+Fields are given as dotted paths, for example `('number', 'head.sha',
+'user.login')`. A path into a list applies to each item of the list.
+"""
+
+
+_WS = re.compile(r'[ \t\n\r]*')
+_STRING = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+# A key (without escapes, so it can be used as is) and the `:` after it.
+_KEY = re.compile(r'"([^"\\]*)"[ \t\n\r]*:[ \t\n\r]*')
+# The separator after a value.
+_SEP = re.compile(r'[ \t\n\r]*([,\]}])[ \t\n\r]*')
+# A string or scalar value, and the separator after it.
+_SCALAR_SEP = re.compile(r'(?:' + _STRING + r'|[^\[\]{}",\s]+)[ \t\n\r]*([,\]}])[ \t\n\r]*')
+# Everything up to (and including) the next bracket which isn't in a string.
+_NEXT_BRACKET = re.compile(r'[^\[\]{}"]*(?:' + _STRING + r'[^\[\]{}"]*)*([\[\]{}])')
+
+_SCALAR = r'(?:' + _STRING + r'|[^\[\]{}",\s]+)'
+
+_scan_once = json.JSONDecoder().scan_once
+_scanstring = json.decoder.scanstring
+
+
+class Spec(dict):
+    """`{key: sub spec or None}`, with a regex skipping unwanted scalar members."""
+
+    def __init__(self, d=()):
+        super().__init__(d)
+        for k, v in self.items():
+            if v is not None and not isinstance(v, Spec):
+                self[k] = Spec(v)
+        wanted = '|'.join(re.escape(k) for k in self)
+        # A run of `"key": scalar,` members, where the key isn't wanted.
+        self.skip_run = re.compile(
+            r'(?:"(?!(?:' + wanted + r')")[^"\\]*"[ \t\n\r]*:[ \t\n\r]*'
+            + _SCALAR + r'[ \t\n\r]*,[ \t\n\r]*)*')
+
+
+def compile_fields(fields):
+    """Turn dotted paths into a nested `{key: sub spec or None}` spec.
+
+    >>> compile_fields(('id', 'user.login', 'user.id', 'head'))
+    {'id': None, 'user': {'login': None, 'id': None}, 'head': None}
+    >>> compile_fields(('head', 'head.sha'))
+    {'head': None}
+    """
+    if isinstance(fields, Spec):
+        return fields
+    if isinstance(fields, dict):
+        return Spec(fields)
+    spec = {}
+    for path in fields:
+        node = spec
+        *parents, leaf = path.split('.')
+        for p in parents:
+            if p in node and node[p] is None:
+                break
+            node = node.setdefault(p, {})
+        else:
+            node[leaf] = None
+    return Spec(spec)
+
+
+def _skip_sep(s, i):
+    """Skip the value starting at `s[i]`, returns the separator after it and its end."""
+    m = _SCALAR_SEP.match(s, i)
+    if m is not None:
+        return m.group(1), m.end()
+    depth = 0
+    while True:
+        m = _NEXT_BRACKET.match(s, i)
+        if m is None:
+            raise ValueError(f'Unterminated JSON value at {i}')
+        i = m.end()
+        depth += 1 if m.group(1) in '[{' else -1
+        if depth == 0:
+            break
+    return _sep(s, i)
+
+
+def _sep(s, i):
+    m = _SEP.match(s, i)
+    if m is None:
+        raise ValueError(f'Expected ",", "]" or "}}" at {i}')
+    return m.group(1), m.end()
+
+
+def _decode(s, i):
+    try:
+        return _scan_once(s, i)
+    except StopIteration:
+        raise ValueError(f'Expected a JSON value at {i}') from None
+
+
+def _value(s, i, spec):
+    """Decode the value at `s[i]`, keeping only `spec`."""
+    c = s[i]
+    if c == '{':
+        value, i = _object(s, i, spec)
+    elif c == '[':
+        value = []
+        i = _WS.match(s, i + 1).end()
+        if s[i] == ']':
+            i += 1
+        else:
+            while True:
+                item, i = _value(s, i, spec)
+                value.append(item)
+                sep, i = _sep(s, i)
+                if sep == ']':
+                    break
+                if sep != ',':
+                    raise ValueError(f'Expected "," or "]" at {i}')
+    else:
+        # Anything else (such as a `null` user) is decoded as is.
+        value, i = _decode(s, i)
+    return value, i
+
+
+def _object(s, i, spec):
+    obj = {}
+    i = _WS.match(s, i + 1).end()
+    if s[i] == '}':
+        return obj, i + 1
+    skip_run = spec.skip_run
+    while True:
+        i = skip_run.match(s, i).end()
+        m = _KEY.match(s, i)
+        if m is not None:
+            key, i = m.group(1), m.end()
+        else:
+            # Keys with escapes.
+            key, i = _scanstring(s, i + 1)
+            m = _WS.match(s, i).end()
+            if s[m] != ':':
+                raise ValueError(f'Expected ":" at {m}')
+            i = _WS.match(s, m + 1).end()
+
+        sub = spec.get(key, _skip_sep)
+        if sub is _skip_sep:
+            sep, i = _skip_sep(s, i)
+        else:
+            obj[key], i = _decode(s, i) if sub is None else _value(s, i, sub)
+            m = _SEP.match(s, i)
+            if m is None:
+                raise ValueError(f'Expected "," or "}}" at {i}')
+            sep, i = m.group(1), m.end()
+        if sep == '}':
+            return obj, i
+        if sep != ',':
+            raise ValueError(f'Expected "," or "}}" at {i}')
+
+
+def _items(s, i, spec):
+    """Yield each item of the array at `s[i]`."""
+    i = _WS.match(s, i + 1).end()
+    if s[i] == ']':
+        return
+    while True:
+        item, i = _value(s, i, spec)
+        yield item
+        sep, i = _sep(s, i)
+        if sep == ']':
+            return
+        if sep != ',':
+            raise ValueError(f'Expected "," or "]" at {i}')
+
+
+def loads(s, fields):
+    """Like `json.loads`, but only decoding `fields`.
+
+    >>> loads('{"id": 1, "user": {"login": "a", "id": 2}, "body": "..."}', ('id', 'user.login'))
+    {'id': 1, 'user': {'login': 'a'}}
+    """
+    spec = compile_fields(fields)
+    try:
+        value, _ = _value(s, _WS.match(s).end(), spec)
+    except IndexError:
+        raise ValueError('Truncated JSON') from None
+    return value
+
+
+def is_array(s):
+    """
+    >>> is_array(' [1]'), is_array('{}')
+    (True, False)
+    """
+    i = _WS.match(s).end()
+    return s[i:i + 1] == '['
+
+
+def iter_array(s, fields):
+    """Yield the items of the JSON array `s`, decoding only `fields` of each.
+
+    >>> list(iter_array('[{"n": 1, "x": [1, {"y": "]"}]}, {"n": 2}]', ('n',)))
+    [{'n': 1}, {'n': 2}]
+    >>> list(iter_array(' [ ] ', ('id',)))
+    []
+    """
+    spec = compile_fields(fields)
+    i = _WS.match(s).end()
+    if s[i:i + 1] != '[':
+        raise ValueError(f'Expected a JSON array, got {s[:50]!r}')
+    try:
+        yield from _items(s, i, spec)
+    except IndexError:
+        raise ValueError('Truncated JSON') from None
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+
+import dataclasses
+import hashlib
+import random
+import threading
+import time
+
+from typing import Optional
+
+
+"""
+Client side pacing for the GitHub API rate limits.
+
+ * Tracks the `X-RateLimit-*` budget per token and resource, and waits for the
+   reset when a budget is exhausted rather than failing.
+ * Spaces mutating requests (POST, PATCH, PUT, DELETE) at least
+   `mutation_interval` seconds apart per token, as GitHub recommends.
+ * Backs off with jitter on secondary rate limits (403 / 429 responses),
+   honouring `Retry-After` when it is given.
+
+https://docs.github.com/en/rest/using-the-rest-api/best-practices-for-using-the-rest-api
+"""
+
+
+MUTATING_METHODS = ('POST', 'PATCH', 'PUT', 'DELETE')
+
+
+@dataclasses.dataclass
+class Budget:
+    resource: str
+    limit: Optional[int] = None
+    remaining: Optional[int] = None
+    reset: Optional[float] = None
+    used: Optional[int] = None
+
+
+def token_id(headers):
+    """Short, non-reversible identity for the token in `headers`.
+
+    >>> token_id({'Authorization': 'token abc'})
+    'b84ff92e7bda'
+    >>> token_id(None)
+    ''
+    """
+    auth = (headers or {}).get('Authorization', '')
+    if not auth:
+        return ''
+    return hashlib.sha256(auth.encode('utf-8')).hexdigest()[:12]
+
+
+def resource_for(url):
+    """
+    >>> resource_for('https://api.github.com/graphql')
+    'graphql'
+    >>> resource_for('https://api.github.com/search/issues?q=x')
+    'search'
+    >>> resource_for('https://api.github.com/repos/a/b')
+    'core'
+    """
+    path = url.split('?', 1)[0]
+    if path.endswith('/graphql'):
+        return 'graphql'
+    if '/search/' in path:
+        return 'search'
+    return 'core'
+
+
+def is_mutation(method, url, json_data=None):
+    """Does the request change anything (and so need pacing)?
+
+    GraphQL reads are POSTs too, only `mutation` operations change anything.
+
+    >>> is_mutation('POST', 'https://api.github.com/repos/a/b/pulls', {'title': 'x'})
+    True
+    >>> is_mutation('GET', 'https://api.github.com/repos/a/b/pulls')
+    False
+    >>> is_mutation('POST', 'https://api.github.com/graphql', {'query': 'query { viewer { login } }'})
+    False
+    >>> is_mutation('POST', 'https://api.github.com/graphql', {'query': 'mutation { x }'})
+    True
+    """
+    if method not in MUTATING_METHODS:
+        return False
+    if resource_for(url) == 'graphql' and isinstance(json_data, dict):
+        return not json_data.get('query', '').lstrip().startswith(('query', '{'))
+    return True
+
+
+def _int_header(headers, name):
+    v = headers.get(name, None)
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    >>> class R:
+    ...     def __init__(self, status, headers, text=''):
+    ...         self.status_code, self.headers, self.text = status, headers, text
+    >>> now = [1000.0]; slept = []
+    >>> rl = RateLimiter(clock=lambda: now[0], sleep=slept.append, jitter=lambda: 1.0)
+
+    Budgets are tracked from the response headers.
+
+    >>> rl.update('t', R(200, {'X-RateLimit-Resource': 'core',
+    ...     'X-RateLimit-Limit': '5000', 'X-RateLimit-Remaining': '0',
+    ...     'X-RateLimit-Reset': '1030', 'X-RateLimit-Used': '5000'}))
+    >>> rl.budget('t')
+    Budget(resource='core', limit=5000, remaining=0, reset=1030.0, used=5000)
+
+    An exhausted budget waits for the reset.
+
+    >>> rl.wait('t', 'core', 'GET'); slept
+    ::warning::GitHub API core rate limit exhausted, waiting 31s for reset.
+    [31.0]
+
+    Mutations are spaced apart.
+
+    >>> slept.clear(); rl.wait('u', 'core', 'POST'); rl.wait('u', 'core', 'POST'); slept
+    [1.0]
+
+    Secondary limits honour Retry-After, otherwise back off exponentially.
+
+    >>> rl.retry_delay(R(429, {'Retry-After': '7'}), 0)
+    7.0
+    >>> rl.retry_delay(R(403, {}, 'You have exceeded a secondary rate limit'), 2)
+    240.0
+    >>> rl.retry_delay(R(403, {}, 'Resource not accessible by integration'), 0) is None
+    True
+    >>> rl.retry_delay(R(200, {}), 0) is None
+    True
+    """
+
+    def __init__(self,
+                 clock=time.time,
+                 sleep=time.sleep,
+                 jitter=lambda: random.uniform(0.5, 1.5),
+                 mutation_interval=1.0,
+                 secondary_backoff=60.0,
+                 max_backoff=15 * 60.0,
+                 max_retries=5):
+        self.clock = clock
+        self.sleep = sleep
+        self.jitter = jitter
+        self.mutation_interval = mutation_interval
+        self.secondary_backoff = secondary_backoff
+        self.max_backoff = max_backoff
+        self.max_retries = max_retries
+        self._budgets = {}
+        self._next_mutation = {}
+        self._lock = threading.Lock()
+
+    def budget(self, token, resource='core'):
+        """Last known budget for `token` and `resource` (or None)."""
+        with self._lock:
+            b = self._budgets.get((token, resource), None)
+            return dataclasses.replace(b) if b is not None else None
+
+    def wait(self, token, resource, method):
+        """Block until a request may be sent."""
+        delay = self.reserve(token, resource, method)
+        if delay > 0:
+            self.sleep(delay)
+
+    def reserve(self, token, resource, method):
+        """Reserve a slot for a request, returning the seconds to wait first."""
+        delay = 0.0
+        with self._lock:
+            now = self.clock()
+            b = self._budgets.get((token, resource), None)
+            if b is not None and b.remaining == 0 and b.reset is not None:
+                if b.reset > now:
+                    # +1 to make sure the window has really rolled over.
+                    delay = b.reset - now + 1
+                    print(f"::warning::GitHub API {resource} rate limit exhausted,"
+                          f" waiting {delay:.0f}s for reset.", flush=True)
+                else:
+                    b.remaining = None
+            if method in MUTATING_METHODS:
+                start = max(now + delay, self._next_mutation.get(token, 0.0))
+                delay = start - now
+                self._next_mutation[token] = start + self.mutation_interval
+        return delay
+
+    def update(self, token, response):
+        """Record the budget reported in `response`s headers."""
+        h = response.headers
+        remaining = _int_header(h, 'X-RateLimit-Remaining')
+        if remaining is None:
+            return
+        resource = h.get('X-RateLimit-Resource', 'core')
+        reset = _int_header(h, 'X-RateLimit-Reset')
+        with self._lock:
+            self._budgets[(token, resource)] = Budget(
+                resource=resource,
+                limit=_int_header(h, 'X-RateLimit-Limit'),
+                remaining=remaining,
+                reset=float(reset) if reset is not None else None,
+                used=_int_header(h, 'X-RateLimit-Used'),
+            )
+
+    def retry_delay(self, response, attempt):
+        """Seconds to wait before retrying, or None if not rate limited."""
+        if response.status_code not in (403, 429):
+            return None
+        h = response.headers
+
+        retry_after = _int_header(h, 'Retry-After')
+        if retry_after is not None:
+            return float(retry_after)
+
+        # Primary limit exhausted.
+        if _int_header(h, 'X-RateLimit-Remaining') == 0:
+            reset = _int_header(h, 'X-RateLimit-Reset')
+            if reset is not None:
+                return max(0.0, reset - self.clock()) + 1
+
+        # Secondary limit without a Retry-After.
+        if response.status_code == 429 or 'secondary rate limit' in response.text.lower():
+            delay = min(self.max_backoff, self.secondary_backoff * (2 ** attempt))
+            return delay * self.jitter()
+        return None
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+
+import dataclasses
+import json
+import os
+import pathlib
+import tempfile
+import time
+
+from typing import Optional
+
+from . import API_URL, get_github_json
+
+
+"""
+Repository metadata store keyed by slug.
+
+One `/repos/{slug}` response also contains the full `parent` and `source`
+repositories, so a single fetch of the private repository fills in the whole
+private / staging / upstream triple. When `GITHUB_API_CACHE_DIR` is set the
+store is shared between processes through a small JSON file with a TTL.
+"""
+
+
+STORE_FILENAME = 'repos.json'
+
+DEFAULT_TTL = 60 * 60
+
+
+@dataclasses.dataclass
+class RepoMetadata:
+    slug: str
+    name: str
+    owner: str
+    default_branch: Optional[str] = None
+    fork: bool = False
+    parent: Optional[str] = None
+    source: Optional[str] = None
+    fetched_at: float = 0.0
+
+    @classmethod
+    def from_json(cls, j, fetched_at):
+        """
+        >>> RepoMetadata.from_json({'full_name': 'a/b', 'name': 'b',
+        ...     'owner': {'login': 'a'}, 'default_branch': 'main', 'fork': True,
+        ...     'parent': {'full_name': 'c/b'}}, 0)
+        RepoMetadata(slug='a/b', name='b', owner='a', default_branch='main', fork=True, parent='c/b', source=None, fetched_at=0)
+        """
+        return cls(
+            slug=j['full_name'],
+            name=j['name'],
+            owner=j['owner']['login'],
+            default_branch=j.get('default_branch', None),
+            fork=j.get('fork', False),
+            parent=j['parent']['full_name'] if 'parent' in j else None,
+            source=j['source']['full_name'] if 'source' in j else None,
+            fetched_at=fetched_at,
+        )
+
+
+class RepoStore:
+    """
+    >>> import tempfile
+    >>> d = tempfile.mkdtemp()
+    >>> s = RepoStore(pathlib.Path(d) / STORE_FILENAME, clock=lambda: 100)
+    >>> s.add_json({'full_name': 'a/b', 'name': 'b', 'owner': {'login': 'a'},
+    ...     'fork': True, 'parent': {'full_name': 'c/b', 'name': 'b',
+    ...     'owner': {'login': 'c'}, 'default_branch': 'master'}}).parent
+    'c/b'
+    >>> sorted(RepoStore(pathlib.Path(d) / STORE_FILENAME, clock=lambda: 100).repos)
+    ['a/b', 'c/b']
+    >>> s.get('c/b', fetch=False).default_branch
+    'master'
+    >>> RepoStore(s.path, clock=lambda: 100 + DEFAULT_TTL).get('c/b', fetch=False) is None
+    True
+
+    A response whose `full_name` differs from the requested slug (different
+    case, or a renamed repository) is stored under both:
+
+    >>> s.add_json({'full_name': 'a/c', 'name': 'c', 'owner': {'login': 'a'}}, slug='A/b').slug
+    'a/c'
+    >>> s.get('A/b', fetch=False) is s.get('a/c', fetch=False)
+    True
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, clock=time.time):
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+        self.repos = {}
+        self._load()
+
+    def _load(self):
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for slug, d in data.items():
+            self.repos[slug] = RepoMetadata(**d)
+
+    def _save(self):
+        if self.path is None:
+            return
+        # Merge with anything other processes have written in the mean time.
+        current = self.repos
+        self.repos = {}
+        self._load()
+        for slug, m in current.items():
+            if slug not in self.repos or self.repos[slug].fetched_at <= m.fetched_at:
+                self.repos[slug] = m
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({k: dataclasses.asdict(v) for k, v in self.repos.items()}, f)
+        os.replace(tmp, self.path)
+
+    def add_json(self, j, slug=None):
+        """
+        Add a `/repos/{slug}` response, including its parent and source, and
+        return the metadata of the repository itself.
+        """
+        now = self.clock()
+        for r in (j.get('parent', None), j.get('source', None)):
+            if r:
+                self.repos[r['full_name']] = RepoMetadata.from_json(r, now)
+        m = self.repos[j['full_name']] = RepoMetadata.from_json(j, now)
+        if slug is not None:
+            self.repos[slug] = m
+        self._save()
+        return m
+
+    def get(self, slug, fetch=True):
+        m = self.repos.get(slug, None)
+        if m is not None and self.clock() - m.fetched_at < self.ttl:
+            return m
+        if not fetch:
+            return None
+        return self.add_json(get_github_json(API_URL + '/repos/{slug}', slug=slug), slug)
+
+    def parent(self, slug):
+        """Metadata for the parent of `slug` (or `slug` itself if not a fork)."""
+        m = self.get(slug)
+        if m.parent is None:
+            return m
+        p = self.get(m.parent, fetch=False)
+        if p is None:
+            p = self.get(m.parent)
+        return p
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        directory = os.environ.get('GITHUB_API_CACHE_DIR', None)
+        path = pathlib.Path(directory) / STORE_FILENAME if directory else None
+        _store = RepoStore(path)
+    return _store
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+
+import dataclasses
+import json
+import random
+import time
+
+import requests
+import urllib3.exceptions
+
+
+"""
+Retries for GitHub API calls which fail because of the network or a transient
+server error.
+
+GET, PATCH, PUT and DELETE are safe to re-send. A POST is only re-sent when it
+is known to have never reached GitHub, or when the caller gives a `precheck`
+which looks for the resource the POST would have created (so a POST which
+actually succeeded is not repeated and no duplicates are made).
+"""
+
+
+class GitHubError(Exception):
+    pass
+
+
+class GitHubNetworkError(GitHubError):
+    """The request failed to get a response from GitHub."""
+
+
+class GitHubResponseError(GitHubError):
+    """GitHub's response could not be decoded."""
+
+    def __init__(self, status_code, text):
+        super().__init__(f'{status_code}: {text[:200]!r}')
+        self.status_code = status_code
+        self.text = text
+
+
+@dataclasses.dataclass
+class RetryPolicy:
+    attempts: int = 4
+    backoff: float = 1.0
+    max_backoff: float = 30.0
+    statuses: tuple = (500, 502, 503, 504)
+
+    def delay(self, attempt, jitter=random.random):
+        """Exponential backoff with (full) jitter.
+
+        >>> RetryPolicy(backoff=1.0).delay(3, jitter=lambda: 1.0)
+        8.0
+        >>> RetryPolicy(backoff=1.0, max_backoff=5).delay(3, jitter=lambda: 0.5)
+        2.5
+        """
+        return min(self.max_backoff, self.backoff * (2 ** attempt)) * jitter()
+
+
+POLICIES = {
+    'GET': RetryPolicy(attempts=4),
+    'PATCH': RetryPolicy(attempts=3),
+    'PUT': RetryPolicy(attempts=3),
+    'DELETE': RetryPolicy(attempts=3),
+    'POST': RetryPolicy(attempts=3),
+}
+
+
+def _not_sent(e):
+    """Did the request fail before anything reached the server?"""
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(e, requests.exceptions.ConnectionError) and e.args:
+        reason = getattr(e.args[0], 'reason', e.args[0])
+        return isinstance(reason, urllib3.exceptions.NewConnectionError)
+    return False
+
+
+def json_response(url, data, status_code=200):
+    """Build a `requests.Response` holding `data`."""
+    r = requests.models.Response()
+    r.url = url
+    r.status_code = status_code
+    r.reason = 'OK'
+    r.headers = requests.structures.CaseInsensitiveDict({'Content-Type': 'application/json'})
+    r._content = json.dumps(data).encode('utf-8')
+    r.encoding = 'utf-8'
+    return r
+
+
+def call(method, url, send, precheck=None, policy=None, sleep=time.sleep, safe=None):
+    """Call `send()` (which returns a `requests.Response`) with retries.
+
+    `precheck()` is called before re-sending a POST and returns the JSON of
+    the already existing resource, or None if the POST should be re-sent.
+    `safe` marks a POST which doesn't change anything (such as a GraphQL
+    query) as safe to re-send.
+
+    >>> class R:
+    ...     def __init__(self, status_code): self.status_code = status_code
+    >>> now = RetryPolicy(backoff=0)
+    >>> replies = [R(502), R(200)]
+    >>> call('GET', 'u', lambda: replies.pop(0), policy=now, sleep=lambda s: None).status_code
+    ::warning::GET u failed (status 502), retry 1 in 0.0s.
+    200
+
+    Without a precheck a POST which may have been processed isn't repeated.
+
+    >>> replies = [R(502), R(201)]
+    >>> call('POST', 'u', lambda: replies.pop(0), policy=now, sleep=lambda s: None).status_code
+    502
+
+    With one, the existing resource is returned instead of a duplicate made.
+
+    >>> replies = [R(502), R(201)]
+    >>> r = call('POST', 'u', lambda: replies.pop(0), precheck=lambda: {'id': 1},
+    ...          policy=now, sleep=lambda s: None)
+    ::warning::POST u failed (status 502), retry 1 in 0.0s.
+    >>> r.status_code, r.json(), r.retries
+    (200, {'id': 1}, 1)
+    """
+    if policy is None:
+        policy = POLICIES.get(method, RetryPolicy(attempts=1))
+    if safe is None:
+        safe = method != 'POST'
+
+    attempt = 0
+    while True:
+        if attempt and not safe and precheck is not None:
+            existing = precheck()
+            if existing is not None:
+                r = json_response(url, existing)
+                r.retries = attempt
+                return r
+
+        try:
+            r = send()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            retryable = safe or precheck is not None or _not_sent(e)
+            if not retryable or attempt + 1 >= policy.attempts:
+                raise GitHubNetworkError(f'{method} {url} failed: {e}') from e
+            reason = str(e)
+        else:
+            retryable = safe or precheck is not None
+            if r.status_code not in policy.statuses or not retryable or attempt + 1 >= policy.attempts:
+                r.retries = attempt
+                return r
+            reason = f'status {r.status_code}'
+
+        delay = policy.delay(attempt)
+        attempt += 1
+        print(f"::warning::{method} {url} failed ({reason}), retry {attempt} in {delay:.1f}s.",
+              flush=True)
+        sleep(delay)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+
+import atexit
+import functools
+import json
+import os
+import re
+import threading
+import time
+
+from typing import NamedTuple, Optional
+
+
+"""
+Per request telemetry and optional profiling for the action scripts.
+
+ * `GITHUB_API_TRACE=<file>` records every GitHub API call (method, URL
+   template, status, latency, bytes, cache hit / miss, retries and rate limit
+   remaining). At exit the calls are appended to `<file>` as JSON lines, so
+   every step of a job adds to the same file, and a summary table is appended
+   to `$GITHUB_STEP_SUMMARY` (when set).
+
+ * `GITHUB_API_PROFILE=<directory>` runs each action entry point under
+   `cProfile` and saves `<directory>/<name>.pstats`.
+"""
+
+
+TRACE_ENV_NAME = 'GITHUB_API_TRACE'
+PROFILE_ENV_NAME = 'GITHUB_API_PROFILE'
+
+
+class CallRecord(NamedTuple):
+    method: str
+    url: str
+    status: Optional[int]
+    latency_ms: float
+    bytes: int = 0
+    cache: Optional[str] = None
+    retries: int = 0
+    rate_remaining: Optional[int] = None
+
+
+_TEMPLATE_RES = [
+    (re.compile(r'^https?://[^/]+'), ''),
+    (re.compile(r'^/repos/[^/]+/[^/]+'), '/repos/{owner}/{repo}'),
+    (re.compile(r'/[0-9a-f]{40}(?=/|$)'), '/{sha}'),
+    (re.compile(r'/\d+(?=/|$)'), '/{id}'),
+    (re.compile(r'/labels/[^/]+$'), '/labels/{name}'),
+    (re.compile(r'/(branches|git/refs/heads)/.+$'), r'/\1/{branch}'),
+]
+
+
+def url_template(url):
+    """Turn a URL into the API endpoint template it came from.
+
+    >>> url_template('https://api.github.com/repos/a/b/deployments/365563468/statuses?per_page=100')
+    '/repos/{owner}/{repo}/deployments/{id}/statuses'
+    >>> url_template('https://api.github.com/repos/a/b/commits/' + 'f' * 40 + '/pulls')
+    '/repos/{owner}/{repo}/commits/{sha}/pulls'
+    >>> url_template('https://api.github.com/repos/a/b/issues/3/labels/needs review')
+    '/repos/{owner}/{repo}/issues/{id}/labels/{name}'
+    """
+    url = url.split('?', 1)[0]
+    for regex, repl in _TEMPLATE_RES:
+        url = regex.sub(repl, url)
+    return url
+
+
+_lock = threading.Lock()
+_calls = []
+_profiles = {}
+_registered = False
+
+
+def enabled():
+    return bool(os.environ.get(TRACE_ENV_NAME, None))
+
+
+def _register():
+    global _registered
+    if not _registered:
+        _registered = True
+        atexit.register(write)
+
+
+def record_response(method, url, start, response=None, error=None):
+    """Record a finished call (`start` is from `time.perf_counter()`)."""
+    if not enabled():
+        return
+    latency_ms = (time.perf_counter() - start) * 1000
+    if response is None:
+        rec = CallRecord(method, url_template(url), None, latency_ms, cache=None)
+    else:
+        remaining = response.headers.get('X-RateLimit-Remaining', None)
+        from_cache = getattr(response, 'from_cache', None)
+        rec = CallRecord(
+            method=method,
+            url=url_template(url),
+            status=response.status_code,
+            latency_ms=latency_ms,
+            bytes=len(response.content or b''),
+            cache=None if from_cache is None else ('hit' if from_cache else 'miss'),
+            retries=getattr(response, 'retries', 0),
+            rate_remaining=int(remaining) if remaining is not None else None,
+        )
+    with _lock:
+        _calls.append(rec)
+        _register()
+
+
+def calls():
+    with _lock:
+        return list(_calls)
+
+
+def instrument(name):
+    """Decorator for action entry points, adding optional `cProfile` output."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kw):
+            directory = os.environ.get(PROFILE_ENV_NAME, None)
+            start = time.perf_counter()
+            if not directory:
+                try:
+                    return fn(*args, **kw)
+                finally:
+                    _entry_point(name, start, None)
+
+            import cProfile
+            os.makedirs(directory, exist_ok=True)
+            # One job's steps share the directory, so tag the file with the
+            # step and process rather than overwriting an earlier step's one.
+            parts = (name, os.environ.get('GITHUB_ACTION', None), str(os.getpid()))
+            path = os.path.join(directory, '.'.join(p for p in parts if p) + '.pstats')
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(fn, *args, **kw)
+            finally:
+                profile.dump_stats(path)
+                _entry_point(name, start, path)
+        return wrapper
+    return decorator
+
+
+def _entry_point(name, start, profile_path):
+    if not enabled() and profile_path is None:
+        return
+    with _lock:
+        _profiles[name] = {
+            'wall_ms': (time.perf_counter() - start) * 1000,
+            'pstats': profile_path,
+        }
+        _register()
+
+
+def summary_table(records):
+    """Markdown table of the calls grouped by method and URL template.
+
+    >>> print(summary_table([
+    ...     CallRecord('GET', '/repos/{owner}/{repo}', 200, 10.0, 100, 'miss'),
+    ...     CallRecord('GET', '/repos/{owner}/{repo}', 200, 2.0, 100, 'hit', 0, 4999),
+    ... ]))
+    | Call | Count | Total ms | Mean ms | Bytes | Cache hits | Retries | Rate remaining |
+    |---|---:|---:|---:|---:|---:|---:|---:|
+    | `GET /repos/{owner}/{repo}` | 2 | 12.0 | 6.0 | 200 | 1 | 0 | 4999 |
+    """
+    groups = {}
+    for r in records:
+        groups.setdefault((r.method, r.url), []).append(r)
+    lines = [
+        '| Call | Count | Total ms | Mean ms | Bytes | Cache hits | Retries | Rate remaining |',
+        '|---|---:|---:|---:|---:|---:|---:|---:|',
+    ]
+    ordered = sorted(groups.items(), key=lambda i: -sum(r.latency_ms for r in i[1]))
+    for (method, url), rs in ordered:
+        total = sum(r.latency_ms for r in rs)
+        remaining = [r.rate_remaining for r in rs if r.rate_remaining is not None]
+        lines.append(
+            f'| `{method} {url}` | {len(rs)} | {total:.1f} | {total/len(rs):.1f}'
+            f' | {sum(r.bytes for r in rs)} | {sum(r.cache == "hit" for r in rs)}'
+            f' | {sum(r.retries for r in rs)} | {min(remaining) if remaining else ""} |')
+    return '\n'.join(lines)
+
+
+def write():
+    """Write the JSON trace file and step summary table."""
+    records = calls()
+    with _lock:
+        profiles = dict(_profiles)
+
+    trace = os.environ.get(TRACE_ENV_NAME, None)
+    if trace:
+        # Tag each line with the step (and process) it came from.
+        step = {'step': os.environ.get('GITHUB_ACTION', None), 'pid': os.getpid()}
+        lines = [json.dumps({'type': 'entry_point', 'name': name, **p, **step})
+                 for name, p in profiles.items()]
+        lines += [json.dumps({'type': 'call', **r._asdict(), **step}) for r in records]
+        if lines:
+            # One write, so the lines of concurrent processes don't interleave.
+            with open(trace, 'a') as f:
+                f.write('\n'.join(lines) + '\n')
+
+    step_summary = os.environ.get('GITHUB_STEP_SUMMARY', None)
+    if step_summary and (records or profiles):
+        with open(step_summary, 'a') as f:
+            f.write('\n### GitHub API calls\n\n')
+            for name, p in profiles.items():
+                f.write(f'`{name}` took {p["wall_ms"]:.0f} ms'
+                        + (f' (profile: `{p["pstats"]}`)' if p['pstats'] else '') + '.\n\n')
+            if records:
+                f.write(summary_table(records) + '\n')
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+
+
+import gzip
+import json
+import os
+import threading
+import urllib.parse
+
+import requests
+import requests.adapters
+import requests.structures
+
+
+"""
+Pluggable transport for the GitHub API session, to record or replay traffic.
+
+Set `GITHUB_API_TRANSPORT` to one of;
+
+ * `passthrough` (default): talk to GitHub as normal.
+ * `record`: talk to GitHub and append every request / response pair
+   (headers included) to the cassette file.
+ * `replay`: serve responses from the cassette without any network access.
+   Requests are matched on method, URL path + query and JSON body; repeated
+   requests are replayed in the order they were recorded.
+
+`GITHUB_API_CASSETTE` gives the cassette path, a gzipped JSON lines file.
+"""
+
+
+MODE_ENV_NAME = 'GITHUB_API_TRANSPORT'
+CASSETTE_ENV_NAME = 'GITHUB_API_CASSETTE'
+
+PASSTHROUGH = 'passthrough'
+RECORD = 'record'
+REPLAY = 'replay'
+
+# Never written to a cassette.
+_SECRET_HEADERS = ('Authorization', 'Cookie')
+# Values of these keys in JSON bodies are never written to a cassette (such as
+# the installation access token returned by `/app/installations/{id}/access_tokens`).
+_SECRET_FIELDS = ('token',)
+REDACTED = 'REDACTED'
+# Don't describe the stored (decoded) body.
+_DROP_RESPONSE_HEADERS = ('Content-Encoding', 'Content-Length', 'Transfer-Encoding', 'Connection')
+
+
+class CassetteMissError(Exception):
+    """No recorded response matches the request being replayed."""
+
+
+def request_key(method, url, body):
+    """
+    >>> request_key('GET', 'https://api.github.com/repos/a/b?per_page=100', None)
+    ('GET', '/repos/a/b?per_page=100', '')
+    >>> request_key('POST', 'http://127.0.0.1:80/x', b'{"b": 1, "a": 2}')
+    ('POST', '/x', '{"a":2,"b":1}')
+    """
+    parts = urllib.parse.urlsplit(url)
+    path = parts.path + ('?' + parts.query if parts.query else '')
+    if body:
+        try:
+            # Redacted as for the cassette, so replayed requests still match.
+            body = redact(json.dumps(json.loads(body), sort_keys=True, separators=(',', ':')))
+        except ValueError:
+            body = body.decode('utf-8', 'replace') if isinstance(body, bytes) else body
+    return (method, path, body or '')
+
+
+def redact(body):
+    """`body` with the values of any secret JSON fields replaced.
+
+    >>> redact('{"token": "ghs_abc", "expires_at": "2021-05-03T01:48:37Z"}')
+    '{"token":"REDACTED","expires_at":"2021-05-03T01:48:37Z"}'
+    >>> redact('[{"app": {"token": "x"}}]')
+    '[{"app":{"token":"REDACTED"}}]'
+    >>> redact('{"id": 1}')
+    '{"id": 1}'
+    >>> redact('not json')
+    'not json'
+    """
+    if not any(f'"{f}"' in body for f in _SECRET_FIELDS):
+        return body
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return body
+
+    def clean(v):
+        if isinstance(v, dict):
+            return {k: (REDACTED if k in _SECRET_FIELDS else clean(i)) for k, i in v.items()}
+        if isinstance(v, list):
+            return [clean(i) for i in v]
+        return v
+
+    return json.dumps(clean(data), separators=(',', ':'))
+
+
+class RecordingAdapter(requests.adapters.HTTPAdapter):
+    """Sends requests as normal, appending each exchange to a cassette."""
+
+    def __init__(self, path, **kw):
+        super().__init__(**kw)
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, request, **kw):
+        r = super().send(request, **kw)
+        entry = {
+            'request': {
+                'method': request.method,
+                'url': request.url,
+                'headers': {k: v for k, v in request.headers.items() if k not in _SECRET_HEADERS},
+                'body': request_key(request.method, request.url, request.body)[2],
+            },
+            'response': {
+                'status': r.status_code,
+                'reason': r.reason,
+                'headers': {k: v for k, v in r.headers.items() if k not in _DROP_RESPONSE_HEADERS},
+                'body': redact(r.content.decode('utf-8', 'replace')),
+            },
+        }
+        line = (json.dumps(entry, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._lock:
+            # Each append is a complete gzip member, so the file stays valid.
+            with gzip.open(self.path, 'ab') as f:
+                f.write(line)
+        return r
+
+
+def load_cassette(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(l) for l in f if l.strip()]
+
+
+class ReplayAdapter(requests.adapters.BaseAdapter):
+    """Serves responses from a cassette, never touching the network."""
+
+    def __init__(self, path):
+        super().__init__()
+        self.interactions = {}
+        for e in load_cassette(path):
+            req = e['request']
+            key = (req['method'],) + request_key(req['method'], req['url'], None)[1:2] + (req['body'],)
+            self.interactions.setdefault(key, []).append(e['response'])
+        self._used = {}
+        self._lock = threading.Lock()
+
+    def send(self, request, **kw):
+        key = request_key(request.method, request.url, request.body)
+        with self._lock:
+            responses = self.interactions.get(key, None)
+            if not responses:
+                raise CassetteMissError(f'No recorded response for {request.method} {request.url}')
+            i = self._used.get(key, 0)
+            self._used[key] = i + 1
+            # Replay in order, repeating the last response once exhausted.
+            recorded = responses[min(i, len(responses) - 1)]
+
+        r = requests.models.Response()
+        r.status_code = recorded['status']
+        r.reason = recorded.get('reason', '')
+        r.headers = requests.structures.CaseInsensitiveDict(recorded['headers'])
+        r._content = recorded['body'].encode('utf-8')
+        r.encoding = 'utf-8'
+        r.url = request.url
+        r.request = request
+        return r
+
+    def close(self):
+        pass
+
+
+def mode():
+    m = os.environ.get(MODE_ENV_NAME, PASSTHROUGH) or PASSTHROUGH
+    assert m in (PASSTHROUGH, RECORD, REPLAY), f"Unknown {MODE_ENV_NAME} {m}"
+    return m
+
+
+def adapter(**kw):
+    """The transport adapter to mount on the API session."""
+    m = mode()
+    if m == PASSTHROUGH:
+        return requests.adapters.HTTPAdapter(**kw)
+    path = os.environ.get(CASSETTE_ENV_NAME, None)
+    if not path:
+        raise SystemError(f'{MODE_ENV_NAME}={m} needs {CASSETTE_ENV_NAME} to be set.')
+    if m == RECORD:
+        return RecordingAdapter(path, **kw)
+    return ReplayAdapter(path)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
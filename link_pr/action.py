@@ -18,62 +18,62 @@
 # SPDX-License-Identifier: Apache-2.0
 
 
+import argparse
+import concurrent.futures
+import dataclasses
 import datetime
 import json
 import os
 import pathlib
-import pprint
 import sys
 
 
 sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
 
 
-from github_api import get_github_json, send_github_json
+from github_api import API_URL, get_github_json, iter_github_json, send_github_json
 from github_api import deployment as dapi
 from github_api import env as genv
+from github_api import log
+from github_api import telemetry
 
 
-def update_deployment():
-    event_json = genv.get_event_json()
-    private, staging, upstream, pr_sha = genv.details(event_json)
-
-    # Get the current deployments
-    deployments_url = f'https://api.github.com/repos/{private.slug}/deployments'
-    deployments_json = get_github_json(deployments_url, preview='ant-man-preview')
-
-    enviro = {}
-    for j in deployments_json:
-        d = dapi.Deployment(**j)
-        if not d.environment.startswith('Upstream PR #'):
-            continue
-        if d.environment in enviro:
-            if d.updated_at < enviro[d.environment].updated_at:
-                print()
-                print(f'::group::Skipping {d.environment} updated on {d.updated_at}')
-                pprint.pprint(d)
-                print("::endgroup::")
-                print()
-                continue
-        enviro[d.environment] = d
-
-    print()
-    print("::group::Current deployments")
-    pprint.pprint(enviro)
-    print("::endgroup::")
-    print()
+def link_deployment(private, upstream, pr_sha, index=None, refresh=True, dry_run=False, verbose=True):
+    """Create or update the "Upstream PR #N" deployment (and its status).
 
+    Returns a short description of what was done.
+    """
     pid = f'Upstream PR #{upstream.pr}'
 
-    create_new = pid not in enviro or enviro[pid].sha != pr_sha
-    if create_new:
+    # Get the current deployment for this environment.
+    if index is None:
+        index = dapi.DeploymentIndex(private.slug)
+    deployments_url = index.url
+    statuses = None
+    if refresh:
+        # One GraphQL query gets both the deployment and its latest status.
+        from github_api import graphql
+        current, status = graphql.fetch_deployment(private.slug, pid)
+        statuses = [status] if status is not None else []
+    else:
+        current = index.get(pid)
+
+    if verbose:
         print()
-        if pid not in enviro:
-            print(f"::group::Created new deployment")
-        elif enviro[pid].sha != pr_sha:
-            print(f"::group::Updating deployment #{enviro[pid].id} (as {enviro[pid].sha} -> {pr_sha})")
+        log.dump("Current deployment", current)
+        print()
+
+    result = 'unchanged'
+    create_new = current is None or current.sha != pr_sha
+    if create_new:
+        result = 'created' if current is None else 'updated'
+        if dry_run:
+            return f'would be {result}'
+
+        if current is None:
+            title = "Created new deployment"
         else:
-            assert False, "????"
+            title = f"Updating deployment #{current.id} (as {current.sha} -> {pr_sha})"
 
         new_deployment = dapi.DeploymentCreate(
             ref=pr_sha,
@@ -85,33 +85,46 @@ def update_deployment():
             transient_environment=True,
             production_environment=False,
         )
-        r = send_github_json(deployments_url, 'POST', new_deployment, preview='ant-man-preview')
-        pprint.pprint(r)
-        print("::endgroup::")
-        print()
-        enviro[pid] = dapi.Deployment(**r)
+        # If the POST has to be retried, make sure it didn't already succeed.
+        r = send_github_json(
+            deployments_url, 'POST', new_deployment, preview='ant-man-preview',
+            precheck=lambda: index.lookup_json(pid, sha=pr_sha))
+        if verbose:
+            print()
+            log.dump(title, r)
+            print()
+        index.update([r])
+        current = dapi.decode_deployment(r)
+        # A deployment which was just created doesn't have any statuses.
+        statuses = []
+
+    deployment = current
+    status_url = f'{API_URL}/repos/{private.slug}/deployments/{current.id}/statuses'
+    if statuses is None:
+        # The deployment and its statuses only depend on the id, so fetch both
+        # at the same time.
+        from github_api import aio
+        deployment_url = f'{API_URL}/repos/{private.slug}/deployments/{current.id}'
+        deployment, statuses = aio.gather(
+            aio.get_github_json(deployment_url, preview='ant-man-preview'),
+            aio.get_github_json(status_url, preview='ant-man-preview'),
+        )
+        deployment = dapi.decode_deployment(deployment)
 
-    print()
-    print(f"::group::Current deployment #{enviro[pid].id}")
-    deployment_url = f'https://api.github.com/repos/{private.slug}/deployments/{enviro[pid].id}'
-    deployment = get_github_json(deployment_url, preview='ant-man-preview')
-    deployment = dapi.Deployment(**deployment)
-    pprint.pprint(deployment)
-    print("::endgroup::")
-    print()
+    if verbose:
+        print()
+        log.dump(f"Current deployment #{current.id}", deployment)
+        print()
 
-    print()
-    print(f"::group::Current deployment #{deployment.id} statuses")
-    status_url = f'https://api.github.com/repos/{private.slug}/deployments/{deployment.id}/statuses'
-    statuses = get_github_json(status_url, preview='ant-man-preview')
-    pprint.pprint(statuses)
-    print("::endgroup::")
-    print()
+        print()
+        log.dump(f"Current deployment #{deployment.id} statuses", statuses)
+        print()
 
     if not statuses:
-        status_url = f'https://api.github.com/repos/{private.slug}/deployments/{deployment.id}/statuses'
-        print()
-        print(f"::group::Created new deployment {deployment.id} status")
+        if dry_run:
+            return 'status would be created'
+        if result == 'unchanged':
+            result = 'status created'
         status = dapi.DeploymentStatusCreate(
             state = dapi.DeploymentState.success,
             description = f"",
@@ -120,13 +133,102 @@ def update_deployment():
             environment_url = f'https://github.com/{upstream.slug}/pull/{upstream.pr}',
             auto_inactive = False,
         )
-        r = send_github_json(status_url, 'POST', status, preview='ant-man-preview')
-        pprint.pprint(r)
-        print("::endgroup::")
-        print()
+        r = send_github_json(
+            status_url, 'POST', status, preview='ant-man-preview',
+            precheck=lambda: (get_github_json(status_url, preview='ant-man-preview') or [None])[0])
+        if verbose:
+            print()
+            log.dump(f"Created new deployment {deployment.id} status", r)
+            print()
+
+    return result
 
+
+@telemetry.instrument('update_deployment')
+def update_deployment():
+    event_json = genv.get_event_json()
+    private, staging, upstream, pr_sha = genv.details(event_json)
+    link_deployment(private, upstream, pr_sha)
     return
 
 
+def find_upstream_prs(staging, upstream, shas):
+    """`{sha: number}` of the upstream pull requests sent for `shas`.
+
+    The commits are looked up in batches with GraphQL, rather than one REST
+    call each.
+    """
+    from github_api import graphql
+    found = {}
+    for sha, prs in graphql.batch_commit_pull_requests(staging.slug, shas).items():
+        for pr in reversed(prs):
+            if pr['baseRepository']['nameWithOwner'] == upstream.slug:
+                found[sha] = pr['number']
+                break
+    return found
+
+
+@telemetry.instrument('reconcile_all')
+def reconcile_all(workers=4, dry_run=False):
+    """Repair the deployment links of every open private pull request."""
+    event_json = genv.get_event_json()
+    private, staging, upstream, _ = genv.details(event_json)
+
+    # Fill the index with a paged scan of the deployments once, rather than
+    # looking up each environment separately.
+    index = dapi.DeploymentIndex(private.slug)
+    index.scan()
+
+    prs = list(iter_github_json(
+        f'{API_URL}/repos/{private.slug}/pulls?state=open',
+        fields=('number', 'head.ref', 'head.sha')))
+    print(f"Reconciling {len(prs)} open pull requests on {private.slug}"
+          f"{' (dry run)' if dry_run else ''}.", flush=True)
+    upstream_prs = find_upstream_prs(staging, upstream, [pr['head']['sha'] for pr in prs])
+
+    def reconcile(pr):
+        pr_sha = pr['head']['sha']
+        upstream_pr = upstream_prs.get(pr_sha, None)
+        if upstream_pr is None:
+            return pr, None, 'no upstream pull request'
+        pr_private = dataclasses.replace(private, branch=pr['head']['ref'], pr=pr['number'])
+        pr_upstream = dataclasses.replace(upstream, pr=upstream_pr)
+        return pr, upstream_pr, link_deployment(
+            pr_private, pr_upstream, pr_sha,
+            index=index, refresh=False, dry_run=dry_run, verbose=False)
+
+    results = {}
+    failed = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(reconcile, pr) for pr in prs]
+        for i, f in enumerate(concurrent.futures.as_completed(futures), 1):
+            try:
+                pr, upstream_pr, result = f.result()
+            except Exception as e:
+                failed += 1
+                print(f"::error::[{i}/{len(prs)}] {e}", flush=True)
+                continue
+            results[result] = results.get(result, 0) + 1
+            target = f" -> {upstream.slug}#{upstream_pr}" if upstream_pr else ""
+            print(f"[{i}/{len(prs)}] #{pr['number']}{target}: {result}", flush=True)
+
+    print()
+    print("Summary:", ', '.join(f'{v} {k}' for k, v in sorted(results.items())) or 'nothing to do')
+    return 1 if failed else 0
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Link private pull requests to upstream ones.')
+    parser.add_argument('--all', action='store_true',
+                        help='Reconcile every open pull request rather than the event one.')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Report what would change without changing anything.')
+    parser.add_argument('--workers', type=int, default=4)
+    opts = parser.parse_args(args)
+    if opts.all:
+        return reconcile_all(workers=opts.workers, dry_run=opts.dry_run)
+    return update_deployment()
+
+
 if __name__ == "__main__":
-    sys.exit(update_deployment())
+    sys.exit(main(sys.argv[1:]))
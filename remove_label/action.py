@@ -17,47 +17,152 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
-
-import json
-import os
+import argparse
+import concurrent.futures
 import pathlib
-import pprint
 import sys
+import urllib.parse
 
 
 sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
 
 
-from github_api import send_github_json
+from github_api import API_URL, add_query, decode_json, send_github_request
+from github_api import env as genv
+from github_api import log
+from github_api import telemetry
+
+
+def label_url(slug, number, name=None):
+    """
+    >>> label_url('a/b', 3, 'needs review')
+    'https://api.github.com/repos/a/b/issues/3/labels/needs%20review'
+    """
+    url = f"{API_URL}/repos/{slug}/issues/{number}/labels"
+    if name is not None:
+        url += '/' + urllib.parse.quote(name, safe='')
+    return url
+
+
+def remove_label(slug, number, name):
+    """Remove one label with a single DELETE.
+
+    Returns 'removed' or 'not present'; raises on any other failure.
+    """
+    r = send_github_request(label_url(slug, number, name), 'DELETE')
+    if r.status_code == 200:
+        return 'removed'
+    if r.status_code == 404:
+        # GitHub answers 404 both when the label isn't on the pull request
+        # and when the pull request itself doesn't exist.
+        if 'Label does not exist' in r.text:
+            return 'not present'
+    raise SystemError(f'{r.status_code}: {r.text[:200]}')
+
+
+def set_labels(slug, number, remove=(), add=()):
+    """Remove labels one DELETE at a time, then add labels with a single POST.
 
+    Neither call replaces the whole set of labels, so a label added by someone
+    else in the mean time is kept. Returns 'updated' or 'not present' (none of
+    the labels to remove were there and there is nothing to add); raises on
+    failure.
+    """
+    results = [remove_label(slug, number, name) for name in sorted(remove)]
+    if add:
+        r = send_github_request(label_url(slug, number), 'POST', {'labels': sorted(add)})
+        if r.status_code != 200:
+            raise SystemError(f'{r.status_code}: {r.text[:200]}')
+        return 'updated'
+    return 'updated' if 'removed' in results else 'not present'
 
-def update_pr():
 
-    event_json_path = os.environ.get('GITHUB_EVENT_PATH', None)
-    if not event_json_path:
-        print("Did not find GITHUB_EVENT_PATH environment value.")
+def search_prs(query):
+    """`(slug, number)` of the pull requests matching a search query."""
+    if 'is:pr' not in query.split():
+        query += ' is:pr'
+    next_url = add_query(f"{API_URL}/search/issues", q=urllib.parse.quote(query), per_page=100)
+    prs = []
+    while next_url:
+        r = send_github_request(next_url, 'GET')
+        if r.status_code != 200:
+            raise SystemError(f'Search {query!r} failed: {r.status_code}: {r.text[:200]}')
+        page = decode_json(r, fields=('items.number', 'items.repository_url'))
+        for item in page['items']:
+            slug = item['repository_url'].rsplit('/repos/', 1)[-1]
+            prs.append((slug, item['number']))
+        next_url = r.links.get('next', {}).get('url', None)
+    return prs
+
+
+@telemetry.instrument('update_pr')
+def update_pr(remove=None, add=(), prs=None, search=None, workers=4):
+    """Remove (and add) labels on a set of pull requests.
+
+    By default the label and pull request of the triggering event are used.
+    Each label to remove takes one DELETE and the labels to add a single POST,
+    so labels changed concurrently by someone else are left alone.
+    """
+    try:
+        event_json = genv.get_event_json(debug=False)
+    except SystemError as e:
+        print(e)
         return -1
 
-    event_json_path = pathlib.Path(event_json_path)
-    if not event_json_path.exists():
-        print(f"Path {event_json_path} was not found.")
-        return -2
+    if remove is None:
+        remove = [event_json.label]
+    if None in remove:
+        print("No label to remove was given and the event doesn't have one.")
+        return -1
+    remove = set(remove)
+    add = set(add)
+    targets = []
+    if search:
+        targets += search_prs(search)
+    for n in (prs or []):
+        targets.append((event_json.repository, int(n)))
+    if not search and not prs:
+        targets.append((event_json.repository, event_json.number))
+    targets = sorted(set(targets))
 
-    with open(event_json_path) as f:
-        event_json = json.load(f)
+    def update(target):
+        slug, number = target
+        try:
+            if len(remove) == 1 and not add:
+                return target, remove_label(slug, number, next(iter(remove)))
+            return target, set_labels(slug, number, remove, add)
+        except Exception as e:
+            return target, f'failed: {e}'
 
-    # /repos/{owner}/{repo}/issues/{issue_number}/labels/{name}
-    api_url = f"https://api.github.com/repos/{event_json['repository']['full_name']}/issues/{event_json['pull_request']['number']}/labels/{event_json['label']['name']}"
     print()
-    r = send_github_json(api_url, "DELETE")
-    if isinstance(r, dict):
-        print(f"Failed to removed {event_json['label']['name']}.")
-        pprint.pprint(r)
-        return -1
-    else:
-        print(f"Removed {event_json['label']['name']}.")
-    return 0
+    labels = ', '.join(sorted(remove) + [f'+{l}' for l in sorted(add)])
+    failed = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for (slug, number), result in pool.map(update, targets):
+            failed_one = result.startswith('failed')
+            failed += failed_one
+            if failed_one:
+                log.error("%s#%s: %s %s", slug, number, labels, result)
+            else:
+                print(f"{slug}#{number}: {labels} {result}.")
+    return -1 if failed else 0
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Remove labels from pull requests.')
+    parser.add_argument('--remove', action='append', metavar='LABEL',
+                        help='Label to remove (default: the label of the event), can be repeated.')
+    parser.add_argument('--add', action='append', default=[], metavar='LABEL',
+                        help='Label to add, can be repeated.')
+    parser.add_argument('--pr', action='append', type=int, metavar='N',
+                        help='Pull request in the event repository (default: the event one), can be repeated.')
+    parser.add_argument('--search', metavar='QUERY',
+                        help='Update every pull request matching this search query.')
+    parser.add_argument('--workers', type=int, default=4)
+    opts = parser.parse_args(args)
+    return update_pr(remove=opts.remove, add=opts.add, prs=opts.pr,
+                     search=opts.search, workers=opts.workers)
 
 
 if __name__ == "__main__":
-    sys.exit(update_pr())
+    sys.exit(main(sys.argv[1:]))
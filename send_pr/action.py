@@ -18,22 +18,59 @@
 # SPDX-License-Identifier: Apache-2.0
 
 
+import argparse
+import concurrent.futures
+import dataclasses
 import datetime
 import json
 import os
 import pathlib
-import pprint
 import sys
+import threading
 
 
 sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
 
 
 import github_api
-from github_api import get_github_json, send_github_json
+from github_api import API_URL, get_github_json, iter_github_json, send_github_json
 from github_api import env as genv
+from github_api import log
+from github_api import telemetry
 
 
+def find_prs(staging, pr_sha):
+    """Pull requests associated with `pr_sha` in the staging repository."""
+    pr_api_url = f'{API_URL}/repos/{staging.slug}/commits/{pr_sha}/pulls'
+    return get_github_json(pr_api_url, preview="groot-preview")
+
+
+def create_pr(staging, upstream, title, body, draft):
+    """Open a pull request from the staging branch to upstream."""
+    pr_api_url = f'{API_URL}/repos/{upstream.slug}/pulls'
+    create_pr_json = {
+        "base": upstream.branch,
+        "head": f"{staging.owner}:{staging.branch}",
+        "title": title,
+        "body": body,
+        "maintainer_can_modify": True,
+        "draft": draft,
+    }
+
+    def existing_pr():
+        prs = get_github_json(
+            f'{pr_api_url}?state=open&head={staging.owner}:{staging.branch}')
+        return prs[0] if prs else None
+
+    # If the POST has to be retried, make sure it didn't already succeed.
+    return send_github_json(pr_api_url, "POST", create_pr_json, precheck=existing_pr)
+
+
+def get_draft():
+    return os.environ.get("INPUT_DRAFT", "false").strip().lower() == "true"
+
+
+@telemetry.instrument('send_pr')
 def send_pr():
     github_api.TOKEN_ENV_NAME = 'STAGING_GITHUB_TOKEN'
     event_json = genv.get_event_json()
@@ -41,33 +78,21 @@ def send_pr():
 
     # Figure out if there are any pull requests associated with the sha at the
     # moment.
-    pr_api_url = f'https://api.github.com/repos/{staging.slug}/commits/{pr_sha}/pulls'
-    prs_json = get_github_json(pr_api_url, preview="groot-preview")
+    prs_json = find_prs(staging, pr_sha)
 
     print()
-    print(f"::group::Current pull requests from {staging.slug} for {pr_sha}")
-    pprint.pprint(prs_json)
-    print("::endgroup::")
+    log.dump(f"Current pull requests from {staging.slug} for {pr_sha}", prs_json)
     print()
 
     if not prs_json:
         # Need to create a new pull request.
-        pr_api_url = f'https://api.github.com/repos/{upstream.slug}/pulls'
-
-        draft = os.environ.get("INPUT_DRAFT", "false").strip().lower() == "true"
-
-        create_pr_json = {
-            "base": upstream.branch,
-            "head": f"{staging.owner}:{staging.branch}",
-            "title": event_json["pull_request"]["title"],
-            "body": event_json["pull_request"]["body"],
-            "maintainer_can_modify": True,
-            "draft": draft,
-        }
-        r = send_github_json(pr_api_url, "POST", create_pr_json)
-        print(f"::group::Created pull request from {staging.slug} {staging.branch} to {upstream.slug}")
-        pprint.pprint(r)
-        print("::endgroup::")
+        r = create_pr(
+            staging, upstream,
+            event_json["pull_request"]["title"],
+            event_json["pull_request"]["body"],
+            get_draft(),
+        )
+        log.dump(f"Created pull request from {staging.slug} {staging.branch} to {upstream.slug}", r)
         print()
         prs_json.append(r)
 
@@ -85,24 +110,239 @@ def send_pr():
     print("Private PR:", private.pr, private.pr_url)
     print("Upstream PR:", upstream.pr, upstream.pr_url)
 
-    print("::set-output name=pr::"+str(upstream.pr))
+    genv.set_output('pr', upstream.pr)
 
     return
 
-def assign_user_to_pr(repo_slug, pr_number, username):
+def assign_user_to_pr(repo_slug, pr_number, username, verbose=True):
     """Assigns a user to a pull request."""
-    assignees_url = f"https://api.github.com/repos/{repo_slug}/issues/{pr_number}/assignees"
+    assignees_url = f"{API_URL}/repos/{repo_slug}/issues/{pr_number}/assignees"
 
     assignees_data = {
         "assignees": [username]
     }
     try:
-        r = send_github_json(assignees_url, "POST", assignees_data)
-        print(f"::group::Assigned {username} to PR #{pr_number} in {repo_slug}")
-        pprint.pprint(r)
-        print("::endgroup::")
+        # Adding an assignee is idempotent, so it is always safe to retry.
+        r = send_github_json(assignees_url, "POST", assignees_data, precheck=lambda: None)
+        if verbose:
+            log.dump(f"Assigned {username} to PR #{pr_number} in {repo_slug}", r)
+        return True
     except Exception as e:
-        print(f"::error::Failed to assign {username} to PR #{pr_number}: {e}")
+        log.error("Failed to assign %s to PR #%s: %s", username, pr_number, e)
+        return False
+
+
+# Batch mode
+# -------------------------------------------------------------------
+
+
+def load_batch(path):
+    """Read `(private PR, staging branch)` pairs from a JSON or JSON lines file.
+
+    Each entry is an object like `{"pr": 123, "branch": "pr-123"}` and may also
+    carry `sha`, `title`, `body` and `user` to save looking up the private PR.
+    """
+    with open(path) as f:
+        text = f.read()
+    if text.lstrip().startswith('['):
+        return json.loads(text)
+    return [json.loads(l) for l in text.splitlines() if l.strip()]
+
+
+def batch_from_api(private):
+    """Every open pull request in the private repository."""
+    return [
+        {
+            'pr': pr['number'],
+            'branch': pr['head']['ref'],
+            'sha': pr['head']['sha'],
+            'title': pr['title'],
+            'body': pr['body'],
+            'user': pr['user']['login'],
+        }
+        for pr in iter_github_json(
+            f'{API_URL}/repos/{private.slug}/pulls?state=open',
+            fields=('number', 'head.ref', 'head.sha', 'title', 'body', 'user.login'))
+    ]
+
+
+class Pipeline:
+    """Run each item through a series of stages, with a concurrency limit per stage.
+
+    Items move through the stages independently, so one item can be in the
+    `create` stage while others are still being looked up. A stage function
+    returns False to stop processing an item. An exception raised by a stage
+    stops only that item and is passed to `on_error(item, stage, exception)`.
+
+    >>> seen = []
+    >>> p = Pipeline([('a', lambda i: seen.append(('a', i)), 2), ('b', lambda i: i != 1, 1)])
+    >>> p.run([1, 2, 3])
+    [1, 2, 3]
+    >>> sorted(seen)
+    [('a', 1), ('a', 2), ('a', 3)]
+    >>> errors = []
+    >>> p = Pipeline([('a', lambda i: 1 // i, 1)], on_error=lambda *a: errors.append(a[:2]))
+    >>> p.run([0, 1])
+    [0, 1]
+    >>> errors
+    [(0, 'a')]
+    """
+
+    def __init__(self, stages, on_error=None):
+        self.stages = [(name, fn, threading.BoundedSemaphore(limit)) for name, fn, limit in stages]
+        self.workers = sum(limit for _, _, limit in stages)
+        self.on_error = on_error
+
+    def _process(self, item):
+        for name, fn, sem in self.stages:
+            try:
+                with sem:
+                    if fn(item) is False:
+                        break
+            except Exception as e:
+                if self.on_error is None:
+                    log.error("%s: %s: %s", item, name, e)
+                else:
+                    self.on_error(item, name, e)
+                break
+        return item
+
+    def run(self, items):
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(self._process, items))
+
+
+def fill_details(private, entries, workers=8):
+    """Fill in `sha`, `title`, `body` and `user` of entries missing them.
+
+    The private pull requests are read with the default token, as the staging
+    token usually can't see the private repository. An entry whose pull request
+    can't be read is marked as failed.
+    """
+    def fill(r):
+        try:
+            pr = get_github_json(f'{API_URL}/repos/{private.slug}/pulls/{r["pr"]}')
+            r.setdefault('sha', pr['head']['sha'])
+            r.setdefault('title', pr['title'])
+            r.setdefault('body', pr['body'])
+            r.setdefault('user', pr['user']['login'])
+        except Exception as e:
+            r['status'], r['error'] = 'failed', f'lookup: {e}'
+
+    missing = [r for r in entries if 'sha' not in r or 'title' not in r]
+    if missing:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            list(pool.map(fill, missing))
+
+
+@telemetry.instrument('send_prs')
+def send_prs(entries, lookup_workers=8, create_workers=2, assign_workers=4):
+    """Send the upstream pull requests for many staging branches.
+
+    The private pull requests are read with the default token; the staging
+    token is only used from the `lookup` stage on. Returns a list of per pull
+    request result dictionaries.
+    """
+    event_json = genv.get_event_json()
+    private, staging, upstream, _ = genv.details(event_json)
+    draft = get_draft()
+    items = [dict(e) for e in entries]
+    fill_details(private, items, lookup_workers)
+    github_api.TOKEN_ENV_NAME = 'STAGING_GITHUB_TOKEN'
+
+    def lookup(r):
+        if r.get('status', None) == 'failed':
+            return False
+        try:
+            prs = find_prs(dataclasses.replace(staging, branch=r['branch']), r['sha'])
+        except Exception as e:
+            r['status'], r['error'] = 'failed', f'lookup: {e}'
+            return False
+        if prs:
+            r['status'], r['upstream_pr'] = 'existing', prs[-1]['number']
+            return False
+
+    def create(r):
+        try:
+            pr = create_pr(
+                dataclasses.replace(staging, branch=r['branch']), upstream,
+                r['title'], r['body'], draft)
+        except Exception as e:
+            pr = {'message': str(e)}
+        if not pr:
+            pr = {'message': 'empty response'}
+        if 'number' not in pr:
+            r['status'], r['error'] = 'failed', f"create: {pr.get('message', pr)}"
+            return False
+        r['status'], r['upstream_pr'] = 'created', pr['number']
+
+    def assign(r):
+        if r.get('user', None):
+            r['assigned'] = assign_user_to_pr(upstream.slug, r['upstream_pr'], r['user'], verbose=False)
+
+    def failed(r, stage, e):
+        r['status'], r['error'] = 'failed', f'{stage}: {e}'
+
+    pipeline = Pipeline([
+        ('lookup', lookup, lookup_workers),
+        ('create', create, create_workers),
+        ('assign', assign, assign_workers),
+    ], on_error=failed)
+    results = pipeline.run(items)
+
+    report = []
+    for r in results:
+        report.append({
+            'private_pr': r['pr'],
+            'staging_branch': r['branch'],
+            'sha': r.get('sha', None),
+            'status': r.get('status', 'failed'),
+            'upstream_pr': r.get('upstream_pr', None),
+            'assigned': r.get('assigned', False),
+            'error': r.get('error', None),
+        })
+    return report
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Send pull requests from staging to upstream.')
+    parser.add_argument('--batch', metavar='FILE',
+                        help="JSON (lines) file of {\"pr\": N, \"branch\": \"...\"} entries,"
+                             " or 'api' for every open private pull request.")
+    parser.add_argument('--report', metavar='FILE', help='Write the batch result report here.')
+    parser.add_argument('--lookup-workers', type=int, default=8)
+    parser.add_argument('--create-workers', type=int, default=2)
+    parser.add_argument('--assign-workers', type=int, default=4)
+    opts = parser.parse_args(args)
+
+    if not opts.batch:
+        return send_pr()
+
+    if opts.batch == 'api':
+        private, _, _, _ = genv.details(genv.get_event_json())
+        entries = batch_from_api(private)
+    else:
+        entries = load_batch(opts.batch)
+
+    report = send_prs(
+        entries,
+        lookup_workers=opts.lookup_workers,
+        create_workers=opts.create_workers,
+        assign_workers=opts.assign_workers,
+    )
+    if opts.report:
+        with open(opts.report, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    counts = {}
+    for r in report:
+        counts[r['status']] = counts.get(r['status'], 0) + 1
+    print("Summary:", ', '.join(f'{v} {k}' for k, v in sorted(counts.items())) or 'nothing to do')
+    return 1 if counts.get('failed', 0) else 0
+
 
 if __name__ == "__main__":
-    sys.exit(send_pr())
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 OpenROAD Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import collections
+import pathlib
+import shutil
+import sys
+import time
+
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+
+from github_api import env as genv
+from github_api import git as ggit
+
+
+"""
+Sync a set of branches and tags from an upstream repository in one pass.
+
+Refs are given as refspecs, `[+]<src>[:<dst>]`, where a name without a `refs/`
+prefix is a branch and a single `*` matches any part of a ref name (as in
+`release/*` or `refs/tags/v*`). Both repositories are listed with
+`git ls-remote` first and only the refs which differ are fetched, into a single
+blobless repository, then pushed with one `git push --atomic`. When nothing has
+moved nothing is fetched or pushed.
+"""
+
+
+Refspec = collections.namedtuple('Refspec', 'src dst force')
+
+
+def _full_ref(name):
+    return name if name.startswith('refs/') else f'refs/heads/{name}'
+
+
+def parse_refspec(spec):
+    """
+    >>> parse_refspec('master')
+    Refspec(src='refs/heads/master', dst='refs/heads/master', force=False)
+    >>> parse_refspec('+release/*:upstream/release/*')
+    Refspec(src='refs/heads/release/*', dst='refs/heads/upstream/release/*', force=True)
+    >>> parse_refspec('refs/tags/v*')
+    Refspec(src='refs/tags/v*', dst='refs/tags/v*', force=False)
+    >>> parse_refspec('a*:b')
+    Traceback (most recent call last):
+    ...
+    ValueError: 'a*:b' must have a `*` in both or neither side
+    """
+    spec = spec.strip()
+    force = spec.startswith('+')
+    src, _, dst = spec.lstrip('+').partition(':')
+    src = _full_ref(src)
+    dst = _full_ref(dst) if dst else src
+    if src.count('*') > 1 or src.count('*') != dst.count('*'):
+        raise ValueError(f'{spec!r} must have a `*` in both or neither side')
+    return Refspec(src, dst, force)
+
+
+def map_ref(refspec, ref):
+    """The destination of `ref` under `refspec`, or None if it doesn't match.
+
+    >>> map_ref(parse_refspec('release/*:up/*'), 'refs/heads/release/1.0')
+    'refs/heads/up/1.0'
+    >>> map_ref(parse_refspec('release/*'), 'refs/heads/master') is None
+    True
+    >>> map_ref(parse_refspec('master'), 'refs/heads/master')
+    'refs/heads/master'
+    """
+    if '*' not in refspec.src:
+        return refspec.dst if ref == refspec.src else None
+    prefix, suffix = refspec.src.split('*')
+    if not (ref.startswith(prefix) and ref.endswith(suffix)) or len(ref) < len(prefix) + len(suffix):
+        return None
+    return refspec.dst.replace('*', ref[len(prefix):len(ref) - len(suffix)])
+
+
+def plan(refspecs, upstream, downstream):
+    """Compare the `{ref: sha}` of both repositories.
+
+    Returns a list of `(src, dst, sha, old_sha, force)`, where `old_sha` is None
+    for refs missing downstream, in `dst` order.
+
+    >>> specs = [parse_refspec('master'), parse_refspec('+release/*')]
+    >>> up = {'refs/heads/master': 'a', 'refs/heads/release/1': 'b', 'refs/heads/dev': 'c'}
+    >>> for p in plan(specs, up, {'refs/heads/master': 'a', 'refs/heads/release/1': 'x'}):
+    ...     print(p)
+    ('refs/heads/master', 'refs/heads/master', 'a', 'a', False)
+    ('refs/heads/release/1', 'refs/heads/release/1', 'b', 'x', True)
+    """
+    # ls-remote matches patterns against the end of ref names, `map_ref` makes
+    # the match exact.
+    refs = {}
+    for ref, sha in upstream.items():
+        for spec in refspecs:
+            dst = map_ref(spec, ref)
+            if dst is not None and dst not in refs:
+                refs[dst] = (ref, dst, sha, downstream.get(dst), spec.force)
+    return [refs[dst] for dst in sorted(refs)]
+
+
+def push_args(changed, force=False):
+    """
+    >>> push_args([('refs/heads/a', 'refs/heads/a', 's1', None, False),
+    ...            ('refs/heads/b', 'refs/heads/b', 's2', 'o2', True)])
+    ['--force-with-lease=refs/heads/b:o2', 's1:refs/heads/a', 's2:refs/heads/b']
+    """
+    leases = []
+    refspecs = []
+    for src, dst, sha, old_sha, ref_force in changed:
+        if force or ref_force:
+            leases.append(f'--force-with-lease={dst}:{old_sha or ""}')
+        refspecs.append(f'{sha}:{dst}')
+    return leases + refspecs
+
+
+def upstream_sync(upstream_url, downstream_url, refspecs, force=False, workdir='repo',
+                  filter_spec='blob:none'):
+    """Sync the refs matching `refspecs` from `upstream_url` to `downstream_url`."""
+    start = time.monotonic()
+    upstream = ggit.ls_remote(upstream_url, *sorted({r.src for r in refspecs}))
+    downstream = ggit.ls_remote(downstream_url, *sorted({r.dst for r in refspecs}))
+    refs = plan(refspecs, upstream, downstream)
+    changed = [r for r in refs if r[2] != r[3]]
+    print(f"Listed {len(refs)} refs ({len(changed)} changed) in {time.monotonic() - start:.2f}s")
+
+    if changed:
+        start = time.monotonic()
+        shutil.rmtree(workdir, ignore_errors=True)
+        ggit.git('init', '--quiet', '--bare', workdir)
+        ggit.configure_promisor(workdir, 'upstream', upstream_url, filter_spec)
+        fetch = ['fetch', '--quiet', '--no-tags', '--no-recurse-submodules']
+        if filter_spec:
+            fetch.append(f'--filter={filter_spec}')
+        ggit.git(*fetch, 'upstream', *sorted({f'+{src}:{src}' for src, *_ in changed}), cwd=workdir)
+        # Push what was fetched, in case upstream moved since it was listed.
+        fetched = ggit.git('rev-parse', *[src for src, *_ in changed], cwd=workdir).split()
+        changed = [(src, dst, sha, old_sha, f)
+                   for (src, dst, _, old_sha, f), sha in zip(changed, fetched)]
+        print(f"Fetched {len(changed)} refs in {time.monotonic() - start:.2f}s")
+
+        start = time.monotonic()
+        ggit.git('push', '--atomic', '--verbose', '--no-recurse-submodules', downstream_url,
+                 *push_args(changed, force), cwd=workdir, capture=False)
+        print(f"Pushed {len(changed)} refs in {time.monotonic() - start:.2f}s")
+    else:
+        print("Nothing has changed, not fetching or pushing.")
+
+    pushed = {dst: (sha, old_sha) for _, dst, sha, old_sha, _ in changed}
+    print()
+    for src, dst, sha, old_sha, _ in refs:
+        if dst in pushed:
+            sha, old_sha = pushed[dst]
+            result = f"changed {old_sha[:12]}..{sha[:12]}" if old_sha else f"created {sha[:12]}"
+        else:
+            result = f"unchanged {sha[:12]}"
+        name = src if src == dst else f"{src} -> {dst}"
+        print(f"{name}: {result}")
+    genv.set_output('changed', len(changed))
+    genv.set_output('unchanged', len(refs) - len(changed))
+    return 0
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Sync branches and tags from an upstream repository.')
+    parser.add_argument('--upstream', required=True, help='URL of the upstream repository.')
+    parser.add_argument('--downstream', required=True, help='URL of the repository to push to.')
+    parser.add_argument('--ref', action='append', required=True, metavar='REFSPEC',
+                        help='[+]<src>[:<dst>] to sync, can be repeated.')
+    parser.add_argument('--force', action='store_true', help='Force push every ref (with a lease).')
+    parser.add_argument('--dir', default='repo', help='Directory for the blobless repository.')
+    opts = parser.parse_args(args)
+    try:
+        refspecs = [parse_refspec(r) for r in opts.ref if r.strip()]
+    except ValueError as e:
+        print(e)
+        return -1
+    try:
+        return upstream_sync(opts.upstream, opts.downstream, refspecs, opts.force, opts.dir)
+    except ggit.GitError as e:
+        print(e)
+        return -1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))